@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""Benchmark the mini_db engine's hot paths.
+
+Run a benchmark and save the results:
+
+    python -m benchmarks.run --sizes 1000,100000 --output before.json
+
+Compare two runs; exits with status 1 if any workload slowed down by more
+than the threshold:
+
+    python -m benchmarks.run --compare before.json after.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from mini_db.database import Database
+
+DEFAULT_SIZES = (1000, 100000, 1000000)
+JOIN_ROWS = 100
+BULK_ROWS = 1000
+WORKLOADS = (
+    "pk_lookup",
+    "filtered_scan",
+    "write_scan",
+    "join",
+    "update",
+    "insert_single",
+    "insert_bulk",
+    "delete",
+    "startup",
+)
+
+USERS_DDL = "CREATE TABLE users (id INT PRIMARY KEY, name TEXT, email TEXT UNIQUE, active BOOL, created DATETIME)"
+ORDERS_DDL = "CREATE TABLE orders (order_id INT PRIMARY KEY, user_id INT, item TEXT)"
+EPOCH = datetime(2024, 1, 1)
+
+
+def user_row(i):
+    return {
+        "id": i,
+        "name": f"user{i % 1000}",
+        "email": f"user{i}@example.com",
+        "active": i % 2 == 0,
+        "created": EPOCH + timedelta(seconds=i),
+    }
+
+
+def populate(db, size):
+    db.execute(USERS_DDL)
+    db.execute(ORDERS_DDL)
+    db.tables["users"].insert_many(user_row(i) for i in range(1, size + 1))
+    step = max(size // JOIN_ROWS, 1)
+    orders = [
+        {"order_id": n, "user_id": 1 + n * step, "item": f"item{n}"}
+        for n in range(min(JOIN_ROWS, size))
+    ]
+    db.tables["orders"].insert_many(orders)
+
+
+def timed(fn, repeat, rows=None):
+    runs = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        runs.append((time.perf_counter() - start) * 1000)
+    result = {
+        "min_ms": min(runs),
+        "median_ms": statistics.median(runs),
+        "mean_ms": statistics.fmean(runs),
+        "runs": len(runs),
+    }
+    if rows:
+        # Throughput for workloads that move many rows at once (load, bulk insert).
+        result["rows_per_s"] = rows / (result["median_ms"] / 1000)
+    return result
+
+
+def bench_size(size, repeat, workloads, workdir, db_options=None):
+    os.chdir(workdir)
+    db_options = db_options or {}
+    db = Database(**db_options)
+    populate(db, size)
+    db.checkpoint()
+    next_id = size + 1
+    results = {}
+
+    def insert_single(i):
+        nonlocal next_id
+        db.execute(f"INSERT INTO users VALUES ({next_id}, 'new', 'new{next_id}@example.com', true, '{EPOCH.isoformat()}')")
+        next_id += 1
+
+    def insert_bulk(i):
+        nonlocal next_id
+        db.tables["users"].insert_many(user_row(n) for n in range(next_id, next_id + BULK_ROWS))
+        next_id += BULK_ROWS
+
+    def write_scan(i):
+        # A write between scans leaves any cached copy of the table stale.
+        db.execute(f"UPDATE users SET active = false WHERE id = {size // 5 + i}")
+        db.execute("SELECT id FROM users WHERE name = 'user7'")
+
+    def startup(i):
+        Database(**db_options)
+
+    cases = {
+        "pk_lookup": lambda i: db.execute(f"SELECT * FROM users WHERE id = {size // 2 + i}"),
+        "filtered_scan": lambda i: db.execute("SELECT id FROM users WHERE name = 'user7'"),
+        "write_scan": write_scan,
+        "join": lambda i: db.execute(
+            "SELECT users.name, orders.item FROM orders INNER JOIN users ON orders.user_id = users.id"),
+        "update": lambda i: db.execute(f"UPDATE users SET name = 'renamed' WHERE id = {size // 3 + i}"),
+        "insert_single": insert_single,
+        "insert_bulk": insert_bulk,
+        "delete": lambda i: db.execute(f"DELETE FROM users WHERE id = {size // 4 + i + 1}"),
+        "startup": startup,
+    }
+    row_counts = {"insert_bulk": BULK_ROWS, "startup": size + JOIN_ROWS}
+    for name in WORKLOADS:
+        if name in workloads:
+            results[name] = timed(cases[name], repeat, row_counts.get(name))
+    return results
+
+
+def run_benchmarks(sizes, repeat=3, workloads=WORKLOADS, db_options=None):
+    cwd = os.getcwd()
+    results = {}
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory(prefix="mini_db_bench_") as workdir:
+                results[str(size)] = bench_size(size, repeat, workloads, workdir, db_options)
+                os.chdir(cwd)
+    finally:
+        os.chdir(cwd)
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": list(sizes),
+            "repeat": repeat,
+            "db_options": db_options or {},
+        },
+        "results": results,
+    }
+
+
+def compare(base, new, threshold, min_delta_ms=0.1):
+    rows = []
+    for size, workloads in new["results"].items():
+        for name, stats in workloads.items():
+            before = base["results"].get(size, {}).get(name)
+            if before is None:
+                continue
+            ratio = stats["median_ms"] / before["median_ms"] if before["median_ms"] else float("inf")
+            rows.append({
+                "size": size,
+                "workload": name,
+                "base_ms": before["median_ms"],
+                "new_ms": stats["median_ms"],
+                "ratio": ratio,
+                # Sub-millisecond timings are noisy; ignore differences below the floor.
+                "regression": ratio > 1 + threshold and stats["median_ms"] - before["median_ms"] > min_delta_ms,
+            })
+    return rows
+
+
+def print_comparison(rows, threshold):
+    print(f"{'size':>8}  {'workload':<14} {'base ms':>10} {'new ms':>10} {'ratio':>7}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['size']:>8}  {row['workload']:<14} {row['base_ms']:>10.3f} {row['new_ms']:>10.3f} {row['ratio']:>7.2f}{flag}")
+    regressions = sum(row["regression"] for row in rows)
+    print(f"{regressions} regression(s) above {threshold:.0%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="mini_db benchmark harness")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="comma-separated table sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per workload (median is compared)")
+    parser.add_argument("--only", default=",".join(WORKLOADS), help="comma-separated workloads to run")
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="compare two result files")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown before a workload counts as a regression (0.2 = 20%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.1,
+                        help="ignore slowdowns smaller than this many milliseconds")
+    parser.add_argument("--buffer-pool-pages", type=int,
+                        help="store tables in pages and keep at most this many in memory")
+    parser.add_argument("--parallel-workers", type=int,
+                        help="run large scans and joins on this many worker processes")
+    parser.add_argument("--durability", choices=["immediate", "deferred"], default="immediate",
+                        help="deferred: write tables only at checkpoints instead of after every statement")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            base = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        rows = compare(base, new, args.threshold, args.min_delta_ms)
+        print_comparison(rows, args.threshold)
+        return 1 if any(row["regression"] for row in rows) else 0
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    workloads = [w.strip() for w in args.only.split(",") if w.strip()]
+    unknown = set(workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"unknown workload(s): {', '.join(sorted(unknown))}")
+    db_options = {}
+    if args.buffer_pool_pages:
+        db_options["buffer_pool_pages"] = args.buffer_pool_pages
+    if args.parallel_workers:
+        db_options["parallel_workers"] = args.parallel_workers
+    if args.durability == "deferred":
+        # No background flusher: every workload would start its own thread.
+        db_options.update(durability="deferred", flush_interval=None)
+    output = json.dumps(run_benchmarks(sizes, args.repeat, workloads, db_options), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
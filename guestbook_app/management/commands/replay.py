@@ -0,0 +1,142 @@
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import Resolver404, resolve
+
+from guestbook_app import views
+from mini_db.database import Database
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    k = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[k]
+
+
+def data_size(db):
+    # Only measurable when the views open the data files themselves.
+    if not isinstance(db, Database):
+        return None
+    total = 0
+    if os.path.exists(db.catalog_file):
+        total += os.path.getsize(db.catalog_file)
+    for root, _, files in os.walk(db.data_dir):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def view_name(path):
+    try:
+        return resolve(path.split("?", 1)[0]).url_name
+    except Resolver404:
+        return "unresolved"
+
+
+class Command(BaseCommand):
+    help = "Replay recorded requests through the guestbook views and report latency per view."
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help='JSON lines file, one {"method", "path", "data"} request per line')
+        parser.add_argument("--concurrency", type=int, default=1, help="number of client threads")
+        parser.add_argument("--repeat", type=int, default=1, help="play the file this many times")
+        parser.add_argument("--json", action="store_true", help="print the report as JSON")
+
+    def load(self, path):
+        requests = []
+        skipped = 0
+        try:
+            with open(path) as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    record = json.loads(line)
+                    # Other JSON lines (e.g. non-HTTP records) are counted and ignored.
+                    if not isinstance(record, dict) or "path" not in record:
+                        skipped += 1
+                        continue
+                    requests.append({
+                        "method": record.get("method", "GET").upper(),
+                        "path": record["path"],
+                        "data": record.get("data") or {},
+                    })
+        except (OSError, json.JSONDecodeError) as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+        return requests, skipped
+
+    def handle(self, *args, **options):
+        requests, skipped = self.load(options["file"])
+        if not requests:
+            raise CommandError(f"No replayable requests in {options['file']} ({skipped} lines skipped)")
+        workload = requests * options["repeat"]
+        local = threading.local()
+
+        def send(req):
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = Client(HTTP_HOST="localhost")
+            start = time.perf_counter()
+            if req["method"] == "POST":
+                response = client.post(req["path"], req["data"])
+            else:
+                response = client.generic(req["method"], req["path"])
+            return view_name(req["path"]), time.perf_counter() - start, response.status_code
+
+        size_before = data_size(views.db)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, options["concurrency"])) as pool:
+            samples = list(pool.map(send, workload))
+        elapsed = time.perf_counter() - start
+        size_after = data_size(views.db)
+
+        by_view = {}
+        for name, latency, status in samples:
+            by_view.setdefault(name, []).append((latency * 1000, status))
+        report = {
+            "requests": len(samples),
+            "skipped_lines": skipped,
+            "concurrency": options["concurrency"],
+            "elapsed_s": elapsed,
+            "throughput_rps": len(samples) / elapsed if elapsed else None,
+            "views": {},
+            "data_bytes_before": size_before,
+            "data_bytes_after": size_after,
+            "data_growth_bytes": size_after - size_before if size_before is not None else None,
+        }
+        for name, results in sorted(by_view.items()):
+            latencies = [latency for latency, _ in results]
+            report["views"][name] = {
+                "count": len(results),
+                "errors": sum(1 for _, status in results if status >= 500),
+                "p50_ms": percentile(latencies, 50),
+                "p95_ms": percentile(latencies, 95),
+                "p99_ms": percentile(latencies, 99),
+            }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(
+            f"{report['requests']} requests in {elapsed:.2f}s "
+            f"({report['throughput_rps']:.1f} req/s, concurrency {options['concurrency']}, "
+            f"{skipped} lines skipped)"
+        )
+        self.stdout.write(f"{'view':<12} {'count':>7} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for name, stats in report["views"].items():
+            self.stdout.write(
+                f"{name:<12} {stats['count']:>7} {stats['errors']:>7} "
+                f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}"
+            )
+        if size_before is None:
+            self.stdout.write("data files: not local (MINI_DB_ADDRESS is set)")
+        else:
+            self.stdout.write(
+                f"data files: {size_before} -> {size_after} bytes ({report['data_growth_bytes']:+d})"
+            )
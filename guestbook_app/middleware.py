@@ -0,0 +1,23 @@
+import json
+import threading
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+class RecordRequestsMiddleware:
+    # Appends every request as a JSON line to GUESTBOOK_RECORD_FILE so that
+    # `manage.py replay` can play the same traffic back later.
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.record_file = getattr(settings, "GUESTBOOK_RECORD_FILE", None)
+        if not self.record_file:
+            raise MiddlewareNotUsed
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        record = {"method": request.method, "path": request.get_full_path()}
+        if request.method == "POST":
+            record["data"] = request.POST.dict()
+        with self.lock:
+            with open(self.record_file, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        return self.get_response(request)
@@ -2,11 +2,17 @@ from django.shortcuts import render, redirect
 from django.http import HttpResponse, HttpResponseBadRequest
 from django.views.decorators.http import require_http_methods
 from django.urls import reverse
+from django.conf import settings
 from mini_db.database import Database
+from mini_db.client import ConnectionPool
 from datetime import datetime
 
-# Reuse a single Database instance for the app (simple, not clustered)
-db = Database()
+# Reuse a single Database instance for the app, or a pool of connections to a
+# mini_db server when MINI_DB_ADDRESS is set (safe for multi-process deployments)
+if settings.MINI_DB_ADDRESS:
+    db = ConnectionPool(settings.MINI_DB_ADDRESS, size=settings.MINI_DB_POOL_SIZE)
+else:
+    db = Database()
 
 # Ensure entries table exists on import/startup
 try:
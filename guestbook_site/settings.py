@@ -16,8 +16,12 @@ MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
+    "guestbook_app.middleware.RecordRequestsMiddleware",
 ]
 
+# Set to a file path to record incoming requests for `manage.py replay`
+GUESTBOOK_RECORD_FILE = os.environ.get("GUESTBOOK_RECORD_FILE")
+
 ROOT_URLCONF = "guestbook_site.urls"
 
 TEMPLATES = [
@@ -31,6 +35,11 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "guestbook_site.wsgi.application"
 
+# Set to host:port or unix:/path to use a shared `python -m mini_db.server`
+# instead of opening the data files in every process.
+MINI_DB_ADDRESS = os.environ.get("MINI_DB_ADDRESS")
+MINI_DB_POOL_SIZE = int(os.environ.get("MINI_DB_POOL_SIZE", "4"))
+
 # Not using Django DB — keep minimal settings
 STATIC_URL = "/static/"
 STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")] if os.path.exists(os.path.join(BASE_DIR, "static")) else []
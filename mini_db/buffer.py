@@ -0,0 +1,114 @@
+import threading
+from collections import OrderedDict
+
+
+class Page:
+    __slots__ = ("heap", "page_no", "slots", "dirty", "pins")
+
+    def __init__(self, heap, page_no, slots):
+        self.heap = heap
+        self.page_no = page_no
+        self.slots = slots
+        self.dirty = False
+        self.pins = 0
+
+
+class BufferPool:
+    # Holds at most `capacity` pages across all tables. Pages are kept in LRU
+    # order; eviction takes the least recently used unpinned clean page, and
+    # only writes back a dirty page when no clean one is available. Pinned
+    # pages are never evicted: if every page is pinned the pool temporarily
+    # exceeds its budget rather than failing, and shrink() evicts the excess
+    # once they are released.
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("Buffer pool needs at least one page")
+        self.capacity = capacity
+        self._pages = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writebacks = 0
+
+    def pin(self, heap, page_no, create=False):
+        key = (heap.directory, page_no)
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+                self.hits += 1
+            else:
+                self._make_room()
+                if create:
+                    page = Page(heap, page_no, [])
+                    page.dirty = True
+                else:
+                    self.misses += 1
+                    page = Page(heap, page_no, heap.read_page(page_no))
+                self._pages[key] = page
+            page.pins += 1
+            return page
+
+    def unpin(self, page, dirty=False):
+        with self._lock:
+            page.pins -= 1
+            if dirty:
+                page.dirty = True
+
+    def shrink(self):
+        with self._lock:
+            self._make_room(keep=self.capacity)
+
+    def _make_room(self, keep=None):
+        keep = self.capacity - 1 if keep is None else keep
+        while len(self._pages) > keep:
+            victim = None
+            for page in self._pages.values():
+                if page.pins == 0 and not page.dirty:
+                    victim = page
+                    break
+            if victim is None:
+                for page in self._pages.values():
+                    if page.pins == 0:
+                        victim = page
+                        break
+            if victim is None:
+                return
+            if victim.dirty:
+                victim.heap.write_page(victim.page_no, victim.slots)
+                self.writebacks += 1
+            del self._pages[(victim.heap.directory, victim.page_no)]
+            self.evictions += 1
+
+    def flush(self, heap=None):
+        written = 0
+        with self._lock:
+            for page in self._pages.values():
+                if page.dirty and (heap is None or page.heap is heap):
+                    written += page.heap.write_page(page.page_no, page.slots)
+                    page.dirty = False
+        return written
+
+    def discard(self, heap):
+        # Drops the heap's pages without writing them back.
+        with self._lock:
+            for key in [key for key, page in self._pages.items() if page.heap is heap]:
+                del self._pages[key]
+
+    def resident(self):
+        return len(self._pages)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "capacity": self.capacity,
+                "resident": len(self._pages),
+                "dirty": sum(1 for page in self._pages.values() if page.dirty),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+                "writebacks": self.writebacks,
+            }
@@ -0,0 +1,137 @@
+import itertools
+import queue
+import socket
+import threading
+
+from . import protocol
+
+
+class RemoteError(Exception):
+    pass
+
+
+class Connection:
+    def __init__(self, address, timeout=None):
+        kind, target = protocol.parse_address(address)
+        if kind == "unix":
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.settimeout(timeout)
+        self.sock.connect(target)
+        self.file = self.sock.makefile("rb")
+        self._ids = itertools.count(1)
+
+    def _read_exact(self, n):
+        data = self.file.read(n)
+        if len(data) < n:
+            raise ConnectionError("mini_db server closed the connection")
+        return data
+
+    def _read_response(self):
+        header = self._read_exact(protocol.HEADER.size)
+        return protocol.decode(self._read_exact(protocol.frame_length(header)))
+
+    def pipeline(self, statements):
+        # Statements are sent without waiting for replies; replies arrive in order.
+        ids = [next(self._ids) for _ in statements]
+        payload = b"".join(protocol.encode({"id": i, "sql": sql}) for i, sql in zip(ids, statements))
+        if len(ids) == 1:
+            self.sock.sendall(payload)
+            responses = [self._read_response()]
+        else:
+            responses = self._send_and_read(payload, len(ids))
+        results = []
+        for expected, response in zip(ids, responses):
+            if response.get("id") != expected:
+                raise ConnectionError("mini_db response out of order")
+            if not response["ok"]:
+                raise RemoteError(response["error"])
+            results.append(response.get("result"))
+        return results
+
+    def _send_and_read(self, payload, count):
+        # The server stops reading while its replies go unread, so a long
+        # pipeline must be drained while it is still being sent.
+        responses = []
+        failure = []
+
+        def read():
+            try:
+                for _ in range(count):
+                    responses.append(self._read_response())
+            except Exception as e:
+                failure.append(e)
+
+        reader = threading.Thread(target=read, name="mini_db-pipeline", daemon=True)
+        reader.start()
+        try:
+            self.sock.sendall(payload)
+        except Exception:
+            # Unblock the reader; the connection is unusable after a failed send.
+            self.sock.shutdown(socket.SHUT_RDWR)
+            reader.join()
+            raise
+        reader.join()
+        if failure:
+            raise failure[0]
+        return responses
+
+    def execute(self, sql):
+        return self.pipeline([sql])[0]
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+class ConnectionPool:
+    def __init__(self, address, size=4, timeout=None):
+        self.address = address
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return Connection(self.address, self.timeout)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, conn, broken=False):
+        if broken:
+            conn.close()
+        else:
+            self._idle.put(conn)
+        self._slots.release()
+
+    def pipeline(self, statements):
+        conn = self._acquire()
+        try:
+            results = conn.pipeline(statements)
+        except RemoteError:
+            self._release(conn)
+            raise
+        except Exception:
+            self._release(conn, broken=True)
+            raise
+        self._release(conn)
+        return results
+
+    def execute(self, sql):
+        return self.pipeline([sql])[0]
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
@@ -0,0 +1,115 @@
+from datetime import datetime
+
+
+def cast_int(value):
+    if isinstance(value, str):
+        if value.isdigit() or (value.startswith('-') and value[1:].isdigit()):
+            return int(value)
+        raise ValueError(f"Invalid INT value: {value}")
+    if isinstance(value, int):
+        return value
+    try:
+        return int(value)
+    except Exception:
+        raise ValueError(f"Invalid INT value: {value}")
+
+
+def cast_text(value):
+    if isinstance(value, str):
+        return value
+    return str(value)
+
+
+def cast_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        v = value.strip().lower()
+        if v in ("true", "false"):
+            return v == "true"
+        if v in ("0", "1"):
+            return v == "1"
+        raise ValueError(f"Invalid BOOL value: {value}")
+    if isinstance(value, int):
+        return bool(value)
+    raise ValueError(f"Invalid BOOL value: {value}")
+
+
+def cast_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except Exception:
+            raise ValueError(f"Invalid DATETIME value: {value}")
+    raise ValueError(f"Invalid DATETIME value: {value}")
+
+
+CASTERS = {
+    "INT": cast_int,
+    "TEXT": cast_text,
+    "BOOL": cast_bool,
+    "DATETIME": cast_datetime,
+}
+
+# Storage (JSON) conversions; types missing here are stored as-is.
+ENCODERS = {"DATETIME": datetime.isoformat}
+DECODERS = {"DATETIME": datetime.fromisoformat}
+
+
+def caster(col_type):
+    try:
+        return CASTERS[col_type]
+    except KeyError:
+        raise ValueError(f"Unknown type: {col_type}")
+
+
+class RowCodec:
+    # Built once per table schema: every per-value decision (which caster,
+    # whether a column needs converting for storage) is made here, not per cell.
+    def __init__(self, columns, col_types):
+        self.columns = tuple(columns)
+        self.casters = tuple(caster(col_types[col]) for col in self.columns)
+        self._cast_by_col = dict(zip(self.columns, self.casters))
+        self._encoders = tuple((col, ENCODERS[col_types[col]]) for col in self.columns if col_types[col] in ENCODERS)
+        self._decoders = tuple((col, DECODERS[col_types[col]]) for col in self.columns if col_types[col] in DECODERS)
+
+    def cast(self, col, value):
+        if value is None:
+            return None
+        return self._cast_by_col[col](value)
+
+    def cast_row(self, values):
+        row = {}
+        for col, cast in zip(self.columns, self.casters):
+            if col not in values:
+                raise ValueError(f"Missing value for column '{col}'")
+            val = values[col]
+            row[col] = None if val is None else cast(val)
+        return row
+
+    def encode_row(self, row):
+        # Rows without DATETIME columns are already JSON-ready and are not copied.
+        if not self._encoders:
+            return row
+        out = dict(row)
+        for col, encode in self._encoders:
+            val = out[col]
+            if val is not None:
+                out[col] = encode(val)
+        return out
+
+    def decode_row(self, data):
+        # Decodes in place: `data` is a freshly parsed JSON object.
+        for col, decode in self._decoders:
+            val = data.get(col)
+            if val is not None:
+                data[col] = decode(val)
+        return data
+
+    def encode_column(self, col, values):
+        for name, encode in self._encoders:
+            if name == col:
+                return [None if v is None else encode(v) for v in values]
+        return list(values)
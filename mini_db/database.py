@@ -1,106 +1,107 @@
 import os
+import re
 import json
+import time
+import logging
+import threading
+import zlib
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
+from .codec import RowCodec, caster
+from .trace import Trace, NULL_TRACE
+from .metrics import Metrics, build_event
+from .parallel import ParallelExecutor
+from .buffer import BufferPool
+from .storage import MemoryHeap, PagedHeap, write_file, replace_file
+from . import planner
+
+logger = logging.getLogger("mini_db")
 
 def cast_value(value, col_type):
     if value is None:
         return None
-    if col_type == "INT":
-        if isinstance(value, str):
-            if value.isdigit() or (value.startswith('-') and value[1:].isdigit()):
-                return int(value)
-            else:
-                raise ValueError(f"Invalid INT value: {value}")
-        elif isinstance(value, int):
-            return value
-        else:
-            try:
-                return int(value)
-            except:
-                raise ValueError(f"Invalid INT value: {value}")
-    elif col_type == "TEXT":
-        if isinstance(value, str):
-            return value
-        else:
-            return str(value)
-    elif col_type == "BOOL":
-        if isinstance(value, bool):
-            return value
-        if isinstance(value, str):
-            v = value.strip().lower()
-            if v in ("true", "false"):
-                return v == "true"
-            elif v in ("0", "1"):
-                return v == "1"
-            else:
-                raise ValueError(f"Invalid BOOL value: {value}")
-        elif isinstance(value, int):
-            return bool(value)
-        else:
-            raise ValueError(f"Invalid BOOL value: {value}")
-    elif col_type == "DATETIME":
-        if isinstance(value, datetime):
-            return value
-        if isinstance(value, str):
-            try:
-                return datetime.fromisoformat(value)
-            except Exception:
-                raise ValueError(f"Invalid DATETIME value: {value}")
-        else:
-            raise ValueError(f"Invalid DATETIME value: {value}")
-    else:
-        raise ValueError(f"Unknown type: {col_type}")
+    return caster(col_type)(value)
+
+def _format_where(where):
+    if not where:
+        return ""
+    return " AND ".join(f"{col} = {expected!r}" for col, expected in where)
+
+def _row_matches(row, where):
+    if where:
+        for col, expected in where:
+            if row.get(col) != expected:
+                return False
+    return True
 
 class Table:
-    def __init__(self, name, columns, col_types, primary_key=None, unique_cols=None, data_dir="data"):
+    def __init__(self, name, columns, col_types, primary_key=None, unique_cols=None, data_dir="data", parallel=None,
+                 buffer_pool=None, page_size=256, storage="disk", durability="immediate"):
         self.name = name
         self.columns = list(columns)
         self.col_types = dict(col_types)
         self.primary_key = primary_key
         self.unique_cols = unique_cols if unique_cols is not None else []
-        self.rows = []
+        self.codec = RowCodec(self.columns, self.col_types)
         self.indexes = {}
         self.data_dir = data_dir
+        self.parallel = parallel
+        self.lock = threading.RLock()
+        # Bumped on every change so cached copies (e.g. parallel snapshots) can tell they are stale.
+        self.version = 0
+        # "memory" tables never read or write files; "deferred" writes wait for checkpoint().
+        self.storage = storage
+        self.durability = durability
         if self.primary_key:
             self.indexes[self.primary_key] = {}
         for col in self.unique_cols:
             if col != self.primary_key:
                 self.indexes[col] = {}
         self.file_path = os.path.join(self.data_dir, f"{self.name}.json")
+        # Memory tables never flush, so logged changes would only pile up.
+        log_changes = storage == "disk" and durability == "immediate"
+        if buffer_pool is not None:
+            self.heap = PagedHeap(os.path.join(self.data_dir, f"{self.name}.pages"), self.codec, buffer_pool,
+                                  page_size, log_changes,
+                                  legacy=MemoryHeap(self.data_dir, self.name, self.codec, log_changes))
+            # Workers would need a full copy of the table, which defeats the memory budget.
+            self.parallel = None
+        else:
+            if storage == "disk" and os.path.isdir(os.path.join(self.data_dir, f"{self.name}.pages")):
+                raise Exception(f"Table {self.name} is stored in pages; open the database with buffer_pool_pages")
+            self.heap = MemoryHeap(self.data_dir, self.name, self.codec, log_changes)
         self._load()
 
     def _load(self):
+        if self.storage == "memory":
+            return
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir)
-        if os.path.exists(self.file_path):
-            with open(self.file_path, "r") as f:
-                try:
-                    data = json.load(f)
-                except json.JSONDecodeError:
-                    data = []
-            for row in data:
-                casted_row = {}
-                for col, val in row.items():
-                    if val is None:
-                        casted_val = None
-                    else:
-                        t = self.col_types[col]
-                        if t == "DATETIME":
-                            casted_val = datetime.fromisoformat(val)
-                        else:
-                            casted_val = val
-                    casted_row[col] = casted_val
-                self.rows.append(casted_row)
-                self._index_row(casted_row)
+        for rid, row in self.heap.load():
+            self._index_row(rid, row)
 
-    def _index_row(self, row):
+    @property
+    def rows(self):
+        return list(self.heap.values())
+
+    def row_count(self):
+        return len(self.heap)
+
+    # Indexes map a key to the row's id in the heap, not to the row itself.
+    def _index_row(self, rid, row):
         if self.primary_key:
             key = row[self.primary_key]
-            self.indexes[self.primary_key][key] = row
+            self.indexes[self.primary_key][key] = rid
         for col in self.unique_cols:
             if col != self.primary_key:
                 key = row[col]
-                self.indexes[col][key] = row
+                self.indexes[col][key] = rid
+
+    def _unindex_row(self, rid, row):
+        for col, index in self.indexes.items():
+            key = row[col]
+            if index.get(key) == rid:
+                del index[key]
 
     def _rebuild_indexes(self):
         self.indexes.clear()
@@ -109,22 +110,69 @@ class Table:
         for col in self.unique_cols:
             if col != self.primary_key:
                 self.indexes[col] = {}
-        for row in self.rows:
-            self._index_row(row)
+        for rid, row in self.heap.scan():
+            self._index_row(rid, row)
 
-    def insert(self, values):
-        row = {}
-        for col in self.columns:
-            if col in values:
-                val = values[col]
-            else:
-                raise ValueError(f"Missing value for column '{col}'")
-            t = self.col_types[col]
-            if val is None:
-                casted_val = None
-            else:
-                casted_val = cast_value(val, t)
-            row[col] = casted_val
+    def _access_path(self, where):
+        # An equality on an indexed column narrows the scan to a single probe;
+        # the primary key is preferred over other unique columns.
+        if not where:
+            return None
+        probes = [(col, expected) for col, expected in where if col in self.indexes]
+        for col, expected in probes:
+            if col == self.primary_key:
+                return col, expected
+        return probes[0] if probes else None
+
+    def _parallel_scan(self, where):
+        # Only filtered scans are worth shipping to workers; index probes never are.
+        # After a write the export is stale; scan serially until it is rebuilt.
+        return (self.parallel is not None and bool(where) and self._access_path(where) is None
+                and self.parallel.applies(len(self.heap)) and self.parallel.prepare(self))
+
+    def plan_scan(self, plan, where, depth=0):
+        plan.add(*self.scan_label(where), depth=depth)
+
+    def scan_label(self, where=None):
+        probe = self._access_path(where)
+        if probe:
+            return f"Index Scan using {probe[0]} on {self.name}", _format_where(where)
+        if self._parallel_scan(where):
+            return f"Parallel Seq Scan on {self.name}", f"{_format_where(where)}; workers={self.parallel.workers}"
+        return f"Seq Scan on {self.name}", _format_where(where)
+
+    def _matching(self, where, trace, ids=True):
+        # (row id, row) pairs; writers need the id to update or remove the row.
+        with self.lock:
+            # Label and execute under one lock so both agree on the scan chosen.
+            operator, detail = self.scan_label(where)
+            with trace.node(operator, detail) as node:
+                probe = self._access_path(where)
+                if probe:
+                    col, key = probe
+                    rid = self.indexes[col].get(key)
+                    row = self.heap.get(rid) if rid is not None else None
+                    candidates = [(rid, row)] if row is not None else []
+                    matched = [item if ids else item[1] for item in candidates if _row_matches(item[1], where)]
+                    node.scanned = len(candidates)
+                elif operator.startswith("Parallel"):
+                    items = list(self.heap.scan()) if ids else list(self.heap.values())
+                    matched = [items[i] for i in self.parallel.scan(self, where)]
+                    node.scanned = len(items)
+                elif ids:
+                    matched = [(rid, row) for rid, row in self.heap.scan() if _row_matches(row, where)]
+                    node.scanned = len(self.heap)
+                else:
+                    matched = [row for row in self.heap.values() if _row_matches(row, where)]
+                    node.scanned = len(self.heap)
+                node.rows = len(matched)
+        return matched
+
+    def _matching_rows(self, where, trace):
+        return self._matching(where, trace, ids=False)
+
+    def _add_row(self, values):
+        row = self.codec.cast_row(values)
         if self.primary_key:
             pk_col = self.primary_key
             key = row[pk_col]
@@ -136,146 +184,628 @@ class Table:
             key = row[col]
             if key in self.indexes[col]:
                 raise Exception(f"UNIQUE constraint failed: duplicate value {key} for column {col}")
-        self.rows.append(row)
-        self._index_row(row)
-        self._save()
+        rid = self.heap.append(row)
+        self._index_row(rid, row)
+        self.version += 1
+        return rid, row
+
+    def insert(self, values, trace=NULL_TRACE):
+        with self.lock, trace.node(f"Insert on {self.name}") as node:
+            _, row = self._add_row(values)
+            node.rows = 1
+            self._save(trace)
         return row
 
-    def _save(self):
-        data = []
-        for row in self.rows:
-            json_row = {}
-            for col, val in row.items():
-                if val is None:
-                    json_val = None
-                else:
-                    t = self.col_types[col]
-                    if t == "DATETIME":
-                        json_val = val.isoformat()
-                    else:
-                        json_val = val
-                json_row[col] = json_val
-            data.append(json_row)
-        if not os.path.exists(self.data_dir):
-            os.makedirs(self.data_dir)
-        with open(self.file_path, "w") as f:
-            json.dump(data, f, indent=2)
+    def insert_many(self, values_list, trace=NULL_TRACE):
+        return len(self._insert_many(values_list, trace))
 
-    def select(self, columns, where=None):
-        result = []
-        for row in self.rows:
-            match = True
-            if where:
-                for col, expected in where:
-                    if col not in row or row[col] != expected:
-                        match = False
-                        break
-            if match:
+    def _insert_many(self, values_list, trace=NULL_TRACE):
+        # All-or-nothing: a constraint failure part way through undoes the batch.
+        with self.lock, trace.node(f"Insert on {self.name}") as node:
+            added = []
+            try:
+                for values in values_list:
+                    added.append(self._add_row(values))
+            except Exception:
+                if added:
+                    self._remove_rows(added)
+                raise
+            node.rows = len(added)
+            if added:
+                self._save(trace)
+        return added
+
+    def _remove_rows(self, items):
+        self.heap.remove([rid for rid, _ in items])
+        for rid, row in items:
+            self._unindex_row(rid, row)
+        self.version += 1
+
+    def _save(self, trace=NULL_TRACE):
+        # Appends the statement's changes to the table's log; the snapshot (or, for
+        # paged tables, every changed page) is written only once the log is large.
+        if self.storage == "memory" or self.durability == "deferred":
+            return
+        with trace.node(f"Save {self.name}") as node:
+            node.bytes = self.heap.flush()
+            if self.heap.needs_checkpoint():
+                node.bytes += self.heap.checkpoint()
+            node.rows = len(self.heap)
+
+    def checkpoint(self):
+        if self.storage == "memory":
+            return
+        with self.lock:
+            self.heap.checkpoint()
+
+    def select(self, columns, where=None, trace=NULL_TRACE):
+        with self.lock:
+            if self._parallel_scan(where):
+                columns = self.columns if columns == ["*"] else list(columns)
+                operator, detail = self.scan_label(where)
+                with trace.node(operator, detail) as node:
+                    result = [dict(zip(columns, values)) for values in self.parallel.scan(self, where, columns)]
+                    node.scanned = len(self.heap)
+                    node.rows = len(result)
+                return result
+            result = []
+            for row in self._matching_rows(where, trace):
                 if columns == ["*"]:
                     result_row = dict(row)
                 else:
                     result_row = {col: row[col] for col in columns}
                 result.append(result_row)
-        return result
+            return result
 
-    def delete(self, where=None):
-        to_delete = []
-        for row in list(self.rows):
-            if where:
-                match = True
-                for col, expected in where:
-                    if row.get(col) != expected:
-                        match = False
-                        break
-                if match:
-                    to_delete.append(row)
-            else:
-                to_delete.append(row)
-        for row in to_delete:
-            self.rows.remove(row)
-        self._rebuild_indexes()
-        self._save()
+    def delete(self, where=None, trace=NULL_TRACE):
+        with self.lock, trace.node(f"Delete on {self.name}") as node:
+            to_delete = self._matching(where, trace)
+            if to_delete:
+                self._remove_rows(to_delete)
+                self._save(trace)
+            node.rows = len(to_delete)
         return len(to_delete)
 
-    def update(self, set_values, where=None):
-        count = 0
-        for row in self.rows:
-            match = True
-            if where:
-                for col, expected in where:
-                    if row.get(col) != expected:
-                        match = False
-                        break
-            if match:
-                for col, new_val in set_values.items():
-                    if col not in self.columns:
-                        raise Exception(f"Unknown column {col}")
-                    t = self.col_types[col]
-                    casted = cast_value(new_val, t)
-                    if col == self.primary_key:
-                        if casted != row[col] and casted in self.indexes[col]:
-                            raise Exception(f"PRIMARY KEY constraint failed: duplicate value {casted} for column {col}")
-                    if col in self.unique_cols and col != self.primary_key:
-                        if casted != row[col] and casted in self.indexes[col]:
-                            raise Exception(f"UNIQUE constraint failed: duplicate value {casted} for column {col}")
-                    if col == self.primary_key:
-                        old_key = row[col]
-                        del self.indexes[col][old_key]
-                        self.indexes[col][casted] = row
-                    if col in self.unique_cols and col != self.primary_key:
-                        old_key = row[col]
-                        del self.indexes[col][old_key]
-                        self.indexes[col][casted] = row
-                    row[col] = casted
+    def update(self, set_values, where=None, trace=NULL_TRACE):
+        with self.lock, trace.node(f"Update on {self.name}") as node:
+            count = 0
+            for rid, old_row in self._matching(where, trace):
+                # Rows are replaced, not mutated: a paged row may be evicted between statements.
+                row = dict(old_row)
+                try:
+                    for col, new_val in set_values.items():
+                        if col not in self.columns:
+                            raise Exception(f"Unknown column {col}")
+                        casted = self.codec.cast(col, new_val)
+                        if col == self.primary_key:
+                            if casted != row[col] and casted in self.indexes[col]:
+                                raise Exception(f"PRIMARY KEY constraint failed: duplicate value {casted} for column {col}")
+                        if col in self.unique_cols and col != self.primary_key:
+                            if casted != row[col] and casted in self.indexes[col]:
+                                raise Exception(f"UNIQUE constraint failed: duplicate value {casted} for column {col}")
+                        if col == self.primary_key:
+                            old_key = row[col]
+                            del self.indexes[col][old_key]
+                            self.indexes[col][casted] = rid
+                        if col in self.unique_cols and col != self.primary_key:
+                            old_key = row[col]
+                            del self.indexes[col][old_key]
+                            self.indexes[col][casted] = rid
+                        row[col] = casted
+                        self.version += 1
+                finally:
+                    if row != old_row:
+                        self.heap.replace(rid, row)
                 count += 1
-        if count > 0:
-            self._save()
+            node.rows = count
+            if count > 0:
+                self._save(trace)
+        return count
+
+def _stable_hash(value):
+    # hash() of str is randomised per process; partition placement must survive restarts.
+    if value is None:
+        text = ""
+    elif isinstance(value, bool):
+        text = "true" if value else "false"
+    elif isinstance(value, datetime):
+        text = value.isoformat()
+    else:
+        text = str(value)
+    return zlib.crc32(text.encode("utf-8"))
+
+class PartitionedTable:
+    def __init__(self, name, columns, col_types, partition, primary_key=None, unique_cols=None, data_dir="data",
+                 parallel=None, on_new_partition=None, **table_options):
+        self.name = name
+        self.columns = list(columns)
+        self.col_types = dict(col_types)
+        self.primary_key = primary_key
+        self.unique_cols = unique_cols if unique_cols is not None else []
+        self.codec = RowCodec(self.columns, self.col_types)
+        # The catalog's partition entry; RANGE partitions are appended to it as they appear.
+        self.partition = partition
+        self.data_dir = data_dir
+        self.parallel = parallel
+        self.on_new_partition = on_new_partition
+        # Storage options (buffer pool, durability, ...) passed on to every partition.
+        self.table_options = table_options
+        # Partitions lock themselves. This lock only covers creating partitions and
+        # reserving values of keys that span partitions (keys other than the partition
+        # column); the uniqueness checks and the writes run without it.
+        self.lock = threading.RLock()
+        self.global_unique = [col for col in dict.fromkeys([primary_key] + self.unique_cols)
+                              if col and col != partition["column"]]
+        # Values of global keys that a write in progress is about to store.
+        self._pending = {col: set() for col in self.global_unique}
+        self.partitions = {}
+        if partition["method"] == "HASH":
+            keys = [f"p{i}" for i in range(partition["partitions"])]
+        else:
+            keys = partition.setdefault("buckets", [])
+        for key in keys:
+            self._open(key)
+
+    def _open(self, key):
+        tbl = Table(f"{self.name}__{key}", self.columns, self.col_types, primary_key=self.primary_key,
+                    unique_cols=self.unique_cols, data_dir=self.data_dir, parallel=self.parallel,
+                    **self.table_options)
+        self.partitions[key] = tbl
+        return tbl
+
+    @property
+    def rows(self):
+        return [row for part in list(self.partitions.values()) for row in part.rows]
+
+    def row_count(self):
+        return sum(part.row_count() for part in list(self.partitions.values()))
+
+    def checkpoint(self):
+        for part in list(self.partitions.values()):
+            part.checkpoint()
+
+    @property
+    def version(self):
+        return sum(part.version for part in list(self.partitions.values()))
+
+    def _key(self, value):
+        if self.partition["method"] == "HASH":
+            return f"p{_stable_hash(value) % self.partition['partitions']}"
+        if value is None:
+            return "null"
+        interval = self.partition["interval"]
+        if interval == "YEAR":
+            return f"{value:%Y}"
+        if interval == "MONTH":
+            return f"{value:%Y_%m}"
+        return f"{value:%Y_%m_%d}"
+
+    def _key_for(self, values):
+        col = self.partition["column"]
+        if col not in values:
+            raise ValueError(f"Missing value for column '{col}'")
+        val = values[col]
+        return self._key(self.codec.cast(col, val))
+
+    def _partition_for(self, key):
+        part = self.partitions.get(key)
+        if part is None:
+            with self.lock:
+                part = self.partitions.get(key)
+                if part is None:
+                    part = self._open(key)
+                    self.partition["buckets"].append(key)
+                    if self.on_new_partition is not None:
+                        self.on_new_partition()
+        return part
+
+    def _prune(self, where):
+        col = self.partition["column"]
+        for c, expected in where or ():
+            if c == col:
+                part = self.partitions.get(self._key(expected))
+                return [part] if part is not None else []
+        return list(self.partitions.values())
+
+    @contextmanager
+    def _reserve(self, keys):
+        # Claims (column, value) pairs for one write. A value another write has
+        # claimed is a duplicate; once the claim is held, no other write can
+        # store the value, so the caller can check the partitions and write
+        # without holding self.lock.
+        with self.lock:
+            claimed = set()
+            for col, value in keys:
+                if value in self._pending[col] or (col, value) in claimed:
+                    raise self._duplicate(col, value)
+                claimed.add((col, value))
+            for col, value in claimed:
+                self._pending[col].add(value)
+        try:
+            yield
+        finally:
+            with self.lock:
+                for col, value in claimed:
+                    self._pending[col].discard(value)
+
+    def _global_keys(self, values):
+        return [(col, self.codec.cast(col, values[col])) for col in self.global_unique
+                if values.get(col) is not None]
+
+    def _duplicate(self, col, value):
+        kind = "PRIMARY KEY" if col == self.primary_key else "UNIQUE"
+        return Exception(f"{kind} constraint failed: duplicate value {value} for column {col}")
+
+    def _check_unique(self, col, value, owner):
+        for part in list(self.partitions.values()):
+            if part is not owner and value in part.indexes[col]:
+                raise self._duplicate(col, value)
+
+    def plan_scan(self, plan, where, depth=0):
+        parts = self._prune(where)
+        if len(parts) == 1:
+            parts[0].plan_scan(plan, where, depth)
+            return
+        plan.add(f"Append on {self.name}", f"{len(parts)} of {len(self.partitions)} partitions", depth)
+        for part in parts:
+            part.plan_scan(plan, where, depth + 1)
+
+    def _matching_rows(self, where, trace):
+        parts = self._prune(where)
+        if len(parts) == 1:
+            return parts[0]._matching_rows(where, trace)
+        with trace.node(f"Append on {self.name}", f"{len(parts)} of {len(self.partitions)} partitions") as node:
+            matched = []
+            for part in parts:
+                matched.extend(part._matching_rows(where, trace))
+            node.rows = len(matched)
+        return matched
+
+    def select(self, columns, where=None, trace=NULL_TRACE):
+        parts = self._prune(where)
+        if len(parts) == 1:
+            return parts[0].select(columns, where, trace)
+        with trace.node(f"Append on {self.name}", f"{len(parts)} of {len(self.partitions)} partitions") as node:
+            result = []
+            for part in parts:
+                result.extend(part.select(columns, where, trace))
+            node.rows = len(result)
+        return result
+
+    def insert(self, values, trace=NULL_TRACE):
+        key = self._key_for(values)
+        keys = self._global_keys(values)
+        with self._reserve(keys):
+            for col, value in keys:
+                self._check_unique(col, value, self.partitions.get(key))
+            return self._partition_for(key).insert(values, trace)
+
+    def insert_many(self, values_list, trace=NULL_TRACE):
+        groups = {}
+        for values in values_list:
+            groups.setdefault(self._key_for(values), []).append(values)
+        batch_keys = {key: [k for values in batch for k in self._global_keys(values)]
+                      for key, batch in groups.items()}
+        with self._reserve([k for keys in batch_keys.values() for k in keys]):
+            for key, keys in batch_keys.items():
+                owner = self.partitions.get(key)
+                for col, value in keys:
+                    self._check_unique(col, value, owner)
+            # All-or-nothing across partitions: undo batches already written if a later one fails.
+            done = []
+            try:
+                for key, batch in groups.items():
+                    part = self._partition_for(key)
+                    done.append((part, part._insert_many(batch, trace)))
+            except Exception:
+                for part, added in done:
+                    with part.lock:
+                        part._remove_rows(added)
+                        part._save()
+                raise
+        return sum(len(added) for _, added in done)
+
+    def update(self, set_values, where=None, trace=NULL_TRACE):
+        if self.partition["column"] in set_values:
+            raise Exception(f"Cannot update partition key column {self.partition['column']}")
+        keys = self._global_keys(set_values)
+        with self._reserve(keys), trace.node(f"Update on {self.name}") as node:
+            count = 0
+            for part in self._prune(where):
+                # The partition's lock keeps rows from appearing between the check and the update.
+                with part.lock:
+                    if keys and part._matching_rows(where, NULL_TRACE):
+                        for col, value in keys:
+                            self._check_unique(col, value, part)
+                    count += part.update(set_values, where, trace)
+            node.rows = count
+        return count
+
+    def delete(self, where=None, trace=NULL_TRACE):
+        with trace.node(f"Delete on {self.name}") as node:
+            count = 0
+            for part in self._prune(where):
+                count += part.delete(where, trace)
+            node.rows = count
         return count
 
 class Database:
-    def __init__(self, catalog_file="catalog.json", data_dir="data"):
+    _STATEMENTS = {
+        "CREATE": ("_parse_create", "_exec_create"),
+        "INSERT": ("_parse_insert", "_exec_insert"),
+        "SELECT": ("_parse_select", "_exec_select"),
+        "UPDATE": ("_parse_update", "_exec_update"),
+        "DELETE": ("_parse_delete", "_exec_delete"),
+        "ANALYZE": ("_parse_analyze", "_exec_analyze"),
+    }
+
+    def __init__(self, catalog_file="catalog.json", data_dir="data", metrics=False, slow_query_ms=None,
+                 parallel_workers=0, parallel_threshold=100000, buffer_pool_pages=None, page_size=256,
+                 storage="disk", durability="immediate", flush_interval=1.0):
+        if storage not in ("disk", "memory"):
+            raise ValueError(f"Unknown storage: {storage}")
+        if durability not in ("immediate", "deferred"):
+            raise ValueError(f"Unknown durability: {durability}")
+        if storage == "memory" and buffer_pool_pages:
+            raise ValueError("A buffer pool needs disk storage")
         self.catalog_file = catalog_file
         self.data_dir = data_dir
         self.catalog = {}
+        # ANALYZE results, kept next to the catalog (catalog.json -> catalog.stats.json).
+        self.statistics_file = os.path.splitext(catalog_file)[0] + ".stats.json"
+        self.statistics = {}
         self.tables = {}
-        if os.path.exists(self.catalog_file):
-            with open(self.catalog_file, "r") as f:
-                self.catalog = json.load(f)
-        if not os.path.exists(self.data_dir):
-            os.makedirs(self.data_dir)
+        self.metrics = Metrics(slow_query_ms) if metrics or slow_query_ms is not None else None
+        self._hooks = []
+        # Guards the catalog; rows are protected by each table's own lock.
+        self._lock = threading.RLock()
+        self.parallel = ParallelExecutor(parallel_workers, parallel_threshold) if parallel_workers else None
+        # With a buffer pool, tables are stored in pages and at most this many stay in memory.
+        self.buffer_pool = BufferPool(buffer_pool_pages) if buffer_pool_pages else None
+        self.page_size = page_size
+        # "memory" never touches catalog_file or data_dir. "deferred" keeps writes in
+        # memory until checkpoint(), close() or the background flush every flush_interval seconds.
+        self.storage = storage
+        self.durability = durability
+        self._flusher = None
+        self._stop_flusher = threading.Event()
+        if self.storage == "disk":
+            if os.path.exists(self.catalog_file):
+                with open(self.catalog_file, "r") as f:
+                    self.catalog = json.load(f)
+            if os.path.exists(self.statistics_file):
+                with open(self.statistics_file, "r") as f:
+                    self.statistics = json.load(f)
+            if not os.path.exists(self.data_dir):
+                os.makedirs(self.data_dir)
         for table_name, schema in self.catalog.items():
-            columns = [col['name'] for col in schema['columns']]
-            col_types = {col['name']: col['type'] for col in schema['columns']}
-            pk = schema.get('primary_key')
-            unique = schema.get('unique', [])
-            tbl = Table(table_name, columns, col_types, primary_key=pk, unique_cols=unique, data_dir=self.data_dir)
-            self.tables[table_name] = tbl
+            self.tables[table_name] = self._open_table(table_name, schema)
+        if self.storage == "disk" and self.durability == "deferred" and flush_interval:
+            self._flusher = threading.Thread(target=self._flush_loop, args=(flush_interval,),
+                                             name="mini_db-flush", daemon=True)
+            self._flusher.start()
+
+    def _open_table(self, table_name, schema):
+        columns = [col['name'] for col in schema['columns']]
+        col_types = {col['name']: col['type'] for col in schema['columns']}
+        pk = schema.get('primary_key')
+        unique = schema.get('unique', [])
+        if self.buffer_pool is None and schema.get('storage') == "paged":
+            raise Exception(f"Table {table_name} is stored in pages; open the database with buffer_pool_pages")
+        storage = {"buffer_pool": self.buffer_pool, "page_size": self.page_size, "storage": self.storage,
+                   "durability": self.durability}
+        # Parallel workers read a full copy of the table, which a memory budget rules out.
+        parallel = self.parallel if self.buffer_pool is None else None
+        if 'partition' in schema:
+            table = PartitionedTable(table_name, columns, col_types, schema['partition'], primary_key=pk,
+                                     unique_cols=unique, data_dir=self.data_dir, parallel=parallel,
+                                     on_new_partition=self._catalog_changed, **storage)
+        else:
+            table = Table(table_name, columns, col_types, primary_key=pk, unique_cols=unique,
+                          data_dir=self.data_dir, parallel=parallel, **storage)
+        if self.buffer_pool is not None and schema.get('storage') != "paged":
+            # Recorded once the pages are in place; from now on the table needs a buffer pool.
+            schema['storage'] = "paged"
+            self.save_catalog()
+        return table
 
     def save_catalog(self):
-        with open(self.catalog_file, "w") as f:
-            json.dump(self.catalog, f, indent=2)
+        if self.storage == "memory":
+            return
+        self._write_json(self.catalog_file, self.catalog)
+
+    def save_statistics(self):
+        if self.storage == "memory":
+            return
+        self._write_json(self.statistics_file, self.statistics)
+
+    def _write_json(self, path, data):
+        # Replaced, never rewritten in place: a crash leaves the old or the new file.
+        write_file(path + ".tmp", json.dumps(data, indent=2).encode("utf-8"))
+        replace_file(path + ".tmp", path)
+
+    def _catalog_changed(self):
+        with self._lock:
+            self.save_catalog()
+
+    def checkpoint(self):
+        # Snapshot every table changed since its last checkpoint, which also empties its change log.
+        for tbl in list(self.tables.values()):
+            tbl.checkpoint()
+
+    def _flush_loop(self, interval):
+        while not self._stop_flusher.wait(interval):
+            try:
+                self.checkpoint()
+            except Exception:
+                logger.exception("mini_db background flush failed")
+
+    def close(self):
+        if self._flusher is not None:
+            self._stop_flusher.set()
+            self._flusher.join()
+            self._flusher = None
+        self.checkpoint()
+        if self.parallel is not None:
+            self.parallel.shutdown()
+        if self.buffer_pool is not None:
+            self.buffer_pool.flush()
+
+    def enable_metrics(self, slow_query_ms=None):
+        self.metrics = Metrics(slow_query_ms)
+
+    def disable_metrics(self):
+        self.metrics = None
+
+    def stats(self):
+        if self.metrics is None:
+            raise Exception("Metrics are disabled; call enable_metrics() first")
+        stats = self.metrics.snapshot()
+        if self.buffer_pool is not None:
+            stats["buffer_pool"] = self.buffer_pool.stats()
+        return stats
+
+    def reset_stats(self):
+        if self.metrics is not None:
+            self.metrics.reset()
+
+    def add_hook(self, callback):
+        self._hooks.append(callback)
+
+    def remove_hook(self, callback):
+        self._hooks.remove(callback)
 
     def execute(self, sql):
+        if self.metrics is None and not self._hooks:
+            return self._execute(sql, NULL_TRACE)
+        return self._execute_instrumented(sql)
+
+    def _execute_instrumented(self, sql):
+        trace = Trace()
+        result = None
+        error = None
+        start = time.perf_counter()
+        try:
+            result = self._execute(sql, trace)
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            event = build_event(sql.strip(), trace, time.perf_counter() - start, result, error)
+            if self.metrics is not None:
+                self.metrics.record(event)
+            for hook in list(self._hooks):
+                try:
+                    hook(event)
+                except Exception:
+                    logger.exception("mini_db hook %r failed", hook)
+
+    def _execute(self, sql, trace):
         sql = sql.strip().rstrip(';').strip()
         if not sql:
             return
         tokens = sql.split()
         cmd = tokens[0].upper()
-        if cmd == "CREATE":
-            return self._exec_create(sql)
+        if cmd == "EXPLAIN":
+            return self._exec_explain(sql, trace)
+        if cmd not in self._STATEMENTS:
+            raise Exception(f"Unknown command: {cmd}")
+        parse, run = self._STATEMENTS[cmd]
+        with self._lock if cmd == "CREATE" else nullcontext():
+            with trace.node("Parse"):
+                query = getattr(self, parse)(sql)
+            return getattr(self, run)(query, trace)
+
+    def _exec_explain(self, sql, trace=NULL_TRACE):
+        m = re.match(r'EXPLAIN\s+(ANALYZE\s+)?(.+)$', sql, re.IGNORECASE | re.DOTALL)
+        if not m:
+            raise Exception("Invalid EXPLAIN syntax")
+        analyze = bool(m.group(1))
+        inner = m.group(2).strip()
+        cmd = inner.split()[0].upper()
+        if analyze and cmd not in self._STATEMENTS and inner in self.tables:
+            # "EXPLAIN ANALYZE users" explains the ANALYZE statement itself.
+            analyze = False
+            inner = f"ANALYZE {inner}"
+            cmd = "ANALYZE"
+        if cmd not in self._STATEMENTS:
+            raise Exception(f"Cannot EXPLAIN {cmd}")
+        if analyze:
+            analyzed = Trace()
+            start = time.perf_counter()
+            try:
+                self._execute(inner, analyzed)
+            finally:
+                # Metrics and hooks see the work the statement did.
+                trace.extend(analyzed)
+            elapsed = time.perf_counter() - start
+            lines = analyzed.format(analyze=True)
+            lines.append(f"Execution time: {elapsed * 1000:.3f} ms")
+        else:
+            query = getattr(self, self._STATEMENTS[cmd][0])(inner)
+            lines = self._plan(cmd, query).format()
+        return [{"plan": line} for line in lines]
+
+    def _plan(self, cmd, query):
+        plan = Trace()
+        table = query["table"]
+        if cmd == "ANALYZE":
+            for name in self._analyze_targets(query):
+                plan.add(f"Analyze {name}")
+        elif cmd == "CREATE":
+            plan.add(f"Create Table {table}")
         elif cmd == "INSERT":
-            return self._exec_insert(sql)
+            plan.add(f"Insert on {table}")
+            plan.add(f"Save {table}", depth=1)
+        elif cmd == "SELECT" and query["join"]:
+            join = query["join"]
+            jp = self._join_plan(query)
+            outer, inner = self.tables[jp["outer"]], self.tables[jp["inner"]]
+            filters = jp["filters"]
+            plan.add(self._join_operator(jp), self._join_detail(query, jp))
+            if jp["method"] == "loop":
+                plan.add(f"Seq Scan on {table}", depth=1)
+                plan.add(f"Seq Scan on {join['table']}", depth=1)
+            elif jp["method"] == "index":
+                outer.plan_scan(plan, filters.get(jp["outer"]), depth=1)
+                plan.add(*self._index_join_label(jp), depth=1)
+            else:
+                if not jp["parallel"]:
+                    outer.plan_scan(plan, filters.get(jp["outer"]), depth=1)
+                plan.add("Hash", f"{jp['inner']}.{jp['keys'][1]}", depth=1)
+                inner.plan_scan(plan, filters.get(jp["inner"]), depth=2)
+            if query["where"]:
+                plan.add("Filter", query["where"])
         elif cmd == "SELECT":
-            return self._exec_select(sql)
-        elif cmd == "UPDATE":
-            return self._exec_update(sql)
-        elif cmd == "DELETE":
-            return self._exec_delete(sql)
+            self.tables[table].plan_scan(plan, query["where"])
         else:
-            raise Exception(f"Unknown command: {cmd}")
+            plan.add(f"{cmd.capitalize()} on {table}")
+            self.tables[table].plan_scan(plan, query["where"], depth=1)
+            plan.add(f"Save {table}", depth=1)
+        return plan
+
+    def _parse_partition(self, sql):
+        # Split a trailing PARTITION BY clause off a CREATE TABLE statement.
+        m = re.search(r'\)\s*PARTITION\s+BY\s+(HASH|RANGE)\s*\(\s*(\w+)\s*\)(.*)$', sql, re.IGNORECASE | re.DOTALL)
+        if not m:
+            return sql, None
+        method = m.group(1).upper()
+        options = m.group(3).strip()
+        if method == "HASH":
+            opt = re.fullmatch(r'PARTITIONS\s+(\d+)', options, re.IGNORECASE)
+            if not opt or int(opt.group(1)) < 1:
+                raise Exception("PARTITION BY HASH needs PARTITIONS n")
+            partition = {"method": "HASH", "column": m.group(2), "partitions": int(opt.group(1))}
+        else:
+            opt = re.fullmatch(r'INTERVAL\s+(YEAR|MONTH|DAY)', options, re.IGNORECASE)
+            if not opt:
+                raise Exception("PARTITION BY RANGE needs INTERVAL YEAR, MONTH or DAY")
+            partition = {"method": "RANGE", "column": m.group(2), "interval": opt.group(1).upper(), "buckets": []}
+        return sql[:m.start() + 1], partition
 
-    def _exec_create(self, sql):
-        import re
+    def _parse_create(self, sql):
+        sql, partition = self._parse_partition(sql)
         pattern = re.compile(r'CREATE\s+TABLE\s+(\w+)\s*\((.+)\)', re.IGNORECASE)
         m = pattern.match(sql)
         if not m:
@@ -335,16 +865,38 @@ class Database:
                     unique_cols.append(col_name)
         if table_name in self.catalog:
             raise Exception(f"Table {table_name} already exists")
-        col_list = [{"name": col, "type": col_types[col]} for col in columns]
-        schema = {"columns": col_list}
-        if primary_key:
-            schema["primary_key"] = primary_key
-        if unique_cols:
-            schema["unique"] = unique_cols
-        self.catalog[table_name] = schema
-        self.save_catalog()
-        tbl = Table(table_name, columns, col_types, primary_key=primary_key, unique_cols=unique_cols, data_dir=self.data_dir)
-        self.tables[table_name] = tbl
+        if partition:
+            if partition["column"] not in col_types:
+                raise Exception(f"Unknown partition column {partition['column']}")
+            if partition["method"] == "RANGE" and col_types[partition["column"]] != "DATETIME":
+                raise Exception("RANGE partitioning needs a DATETIME column")
+        return {
+            "table": table_name,
+            "columns": columns,
+            "col_types": col_types,
+            "primary_key": primary_key,
+            "unique_cols": unique_cols,
+            "partition": partition,
+        }
+
+    def _exec_create(self, query, trace=NULL_TRACE):
+        table_name = query["table"]
+        columns = query["columns"]
+        col_types = query["col_types"]
+        primary_key = query["primary_key"]
+        unique_cols = query["unique_cols"]
+        with trace.node(f"Create Table {table_name}"):
+            col_list = [{"name": col, "type": col_types[col]} for col in columns]
+            schema = {"columns": col_list}
+            if primary_key:
+                schema["primary_key"] = primary_key
+            if unique_cols:
+                schema["unique"] = unique_cols
+            if query["partition"]:
+                schema["partition"] = query["partition"]
+            self.catalog[table_name] = schema
+            self.save_catalog()
+            self.tables[table_name] = self._open_table(table_name, schema)
         return f"Table {table_name} created."
 
     def _parse_values(self, val_str):
@@ -379,8 +931,25 @@ class Database:
                 clean_vals.append(v)
         return clean_vals
 
-    def _exec_insert(self, sql):
-        import re
+    def _parse_where(self, tbl, where_part):
+        where_list = []
+        if where_part:
+            conditions = [c.strip() for c in where_part.split("AND")]
+            for cond in conditions:
+                if '=' not in cond:
+                    raise Exception("Invalid WHERE condition")
+                left, right = cond.split('=',1)
+                left = left.strip()
+                right = right.strip()
+                if (right.startswith("'") and right.endswith("'")) or (right.startswith('"') and right.endswith('"')):
+                    right = right[1:-1]
+                if left not in tbl.columns:
+                    raise Exception(f"Unknown column {left}")
+                val = tbl.codec.cast(left, right)
+                where_list.append((left, val))
+        return where_list
+
+    def _parse_insert(self, sql):
         pattern = re.compile(r'INSERT\s+INTO\s+(\w+)\s*(\((.*?)\))?\s*VALUES\s*\((.*)\)', re.IGNORECASE)
         m = pattern.match(sql)
         if not m:
@@ -403,10 +972,12 @@ class Database:
             if col not in tbl.columns:
                 raise Exception(f"Unknown column {col}")
             row[col] = val
-        return tbl.insert(row)
+        return {"table": table_name, "values": row}
 
-    def _exec_select(self, sql):
-        tokens = sql.split()
+    def _exec_insert(self, query, trace=NULL_TRACE):
+        return self.tables[query["table"]].insert(query["values"], trace=trace)
+
+    def _parse_select(self, sql):
         if not sql.upper().startswith("SELECT"):
             raise Exception("Invalid SELECT syntax")
         select_part = sql[6:]
@@ -418,16 +989,11 @@ class Database:
         cols = [c.strip() for c in cols_str.split(',')]
         if cols == ['*']:
             cols = ['*']
-        parts = rest.split()
-        table1 = parts[0]
-        join_table = None
-        where_condition = None
         if "INNER JOIN" in rest.upper():
             upper_rest = rest.upper()
             join_idx = upper_rest.find("INNER JOIN")
             table1 = rest[:join_idx].strip()
             rest2 = rest[join_idx:]
-            import re
             m = re.match(r'INNER\s+JOIN\s+(\w+)\s+ON\s+(.+)', rest2, re.IGNORECASE)
             if not m:
                 raise Exception("Invalid INNER JOIN syntax")
@@ -443,12 +1009,8 @@ class Database:
             if '=' not in on_cond:
                 raise Exception("Invalid JOIN ON condition")
             left, right = [x.strip() for x in on_cond.split('=', 1)]
-            join_table = table2
-            # perform join
-            if table1 not in self.tables or join_table not in self.tables:
-                raise Exception(f"Table {table1 if table1 not in self.tables else join_table} does not exist")
-            t1 = self.tables[table1]
-            t2 = self.tables[join_table]
+            if table1 not in self.tables or table2 not in self.tables:
+                raise Exception(f"Table {table1 if table1 not in self.tables else table2} does not exist")
             def parse_col(col_str):
                 if '.' in col_str:
                     tbl, col = col_str.split('.',1)
@@ -460,20 +1022,224 @@ class Database:
             if left_tbl is None:
                 left_tbl = table1
             if right_tbl is None:
-                right_tbl = join_table
-            result = []
-            for row1 in t1.rows:
-                for row2 in t2.rows:
-                    val1 = row1[left_col] if left_tbl == table1 else row2[left_col]
-                    val2 = row2[right_col] if right_tbl == join_table else row1[right_col]
-                    if val1 == val2:
-                        combined = {}
-                        for col in t1.columns:
-                            combined[f"{table1}.{col}"] = row1[col]
-                        for col in t2.columns:
-                            combined[f"{join_table}.{col}"] = row2[col]
-                        result.append(combined)
-            if where_condition:
+                right_tbl = table2
+            join = {
+                "table": table2,
+                "on": f"{left} = {right}",
+                "left_tbl": left_tbl,
+                "left_col": left_col,
+                "right_tbl": right_tbl,
+                "right_col": right_col,
+            }
+            return {"cols": cols, "table": table1, "join": join, "where": where_condition}
+        if "WHERE" in rest.upper():
+            table1, where_condition = rest.split("WHERE",1)
+            table1 = table1.strip()
+            where_condition = where_condition.strip()
+        else:
+            table1 = rest.strip()
+            where_condition = None
+        if table1 not in self.tables:
+            raise Exception(f"Table {table1} does not exist")
+        tbl = self.tables[table1]
+        if cols != ['*']:
+            for c in cols:
+                if c not in tbl.columns:
+                    raise Exception(f"Unknown column {c}")
+        where_list = self._parse_where(tbl, where_condition)
+        return {"cols": cols, "table": table1, "join": None, "where": where_list}
+
+    def _exec_select(self, query, trace=NULL_TRACE):
+        if query["join"]:
+            return self._exec_join(query, trace)
+        tbl = self.tables[query["table"]]
+        cols = query["cols"]
+        if cols == ['*']:
+            return tbl.select(tbl.columns, where=query["where"], trace=trace)
+        return tbl.select(cols, where=query["where"], trace=trace)
+
+    def _join_keys(self, query):
+        # ON comparing one column from each side is an equi-join; returns
+        # (FROM table column, joined table column), or None for anything else.
+        join = query["join"]
+        left_outer = join["left_tbl"] == query["table"]
+        right_inner = join["right_tbl"] == join["table"]
+        if left_outer and right_inner:
+            return join["left_col"], join["right_col"]
+        if not left_outer and not right_inner:
+            return join["right_col"], join["left_col"]
+        return None
+
+    def _join_plan(self, query):
+        # Without statistics: hash join built on the joined table and probed by
+        # the FROM table, which keeps the nested loop's output order. Once both
+        # tables are analyzed the cost model picks the order and algorithm.
+        table1, table2 = query["table"], query["join"]["table"]
+        keys = self._join_keys(query)
+        jp = {"outer": table1, "inner": table2, "keys": keys, "filters": {}, "parallel": False, "cost": None}
+        if keys is None:
+            return dict(jp, method="loop")
+        if table1 in self.statistics and table2 in self.statistics:
+            return self._cost_join(query, keys)
+        outer = self.tables[table1]
+        # Partition writers do not take the partitioned table's lock, so its rows could
+        # change between reading them and the workers' export; only plain tables qualify.
+        parallel = (self.parallel is not None and isinstance(outer, Table)
+                    and self.parallel.applies(outer.row_count()) and self.parallel.prepare(outer))
+        return dict(jp, method="hash", parallel=parallel)
+
+    def _cost_join(self, query, keys):
+        table1, table2 = query["table"], query["join"]["table"]
+        filters = self._join_filters(query)
+        orders = [(table1, table2, keys)]
+        if table2 != table1:
+            orders.append((table2, table1, keys[::-1]))
+        candidates = []
+        for outer_name, inner_name, (outer_col, inner_col) in orders:
+            outer, inner = self.tables[outer_name], self.tables[inner_name]
+            outer_where, inner_where = filters.get(outer_name), filters.get(inner_name)
+            outer_rows = planner.estimate_rows(outer, outer_where, self.statistics.get(outer_name))
+            inner_rows = planner.estimate_rows(inner, inner_where, self.statistics.get(inner_name))
+            outer_scan = planner.scan_cost(outer, outer_where)
+            inner_scan = planner.scan_cost(inner, inner_where)
+            base = {"outer": outer_name, "inner": inner_name, "keys": (outer_col, inner_col), "filters": filters,
+                    "parallel": False}
+            candidates.append((outer_scan + inner_scan + planner.hash_join_cost(outer_rows, inner_rows),
+                               dict(base, method="hash")))
+            if isinstance(inner, Table) and inner_col in inner.indexes:
+                candidates.append((outer_scan + planner.index_join_cost(outer_rows), dict(base, method="index")))
+            if (self.parallel is not None and not outer_where and isinstance(outer, Table)
+                    and self.parallel.applies(outer.row_count()) and self.parallel.prepare(outer)):
+                cost = inner_scan + planner.parallel_hash_join_cost(outer_rows, inner_rows, self.parallel.workers)
+                candidates.append((cost, dict(base, method="hash", parallel=True)))
+        # Ties keep the earlier candidate: the FROM order and a plain hash join.
+        cost, jp = min(candidates, key=lambda c: c[0])
+        jp["cost"] = cost
+        return jp
+
+    def _join_filters(self, query):
+        # Equalities on qualified columns (`tbl.col = value`) are also applied to
+        # that table's scan, so the join sees fewer rows. The Filter after the
+        # join still runs, so a condition that cannot be pushed down is harmless.
+        where = query["where"]
+        table1, table2 = query["table"], query["join"]["table"]
+        if not where or table1 == table2:
+            return {}
+        filters = {}
+        for cond in where.split("AND"):
+            if '=' not in cond:
+                continue
+            left, right = [x.strip() for x in cond.split('=', 1)]
+            if '.' not in left:
+                continue
+            name, col = left.split('.', 1)
+            if name not in (table1, table2) or col not in self.tables[name].columns:
+                continue
+            if (right.startswith("'") and right.endswith("'")) or (right.startswith('"') and right.endswith('"')):
+                right = right[1:-1]
+            elif right.upper() == "NULL":
+                continue
+            try:
+                value = self.tables[name].codec.cast(col, right)
+            except ValueError:
+                continue
+            filters.setdefault(name, []).append((col, value))
+        return filters
+
+    def _join_operator(self, jp):
+        if jp["method"] == "hash":
+            return "Parallel Hash Join" if jp["parallel"] else "Hash Join"
+        return "Nested Loop Join"
+
+    def _join_detail(self, query, jp):
+        detail = query["join"]["on"]
+        if jp["cost"] is not None:
+            detail += f"; cost={jp['cost']:.0f}"
+        return detail
+
+    def _index_join_label(self, jp):
+        outer_col, inner_col = jp["keys"]
+        detail = f"{inner_col} = {jp['outer']}.{outer_col}"
+        inner_where = jp["filters"].get(jp["inner"])
+        if inner_where:
+            detail += " AND " + _format_where(inner_where)
+        return f"Index Scan using {inner_col} on {jp['inner']}", detail
+
+    def _exec_join(self, query, trace=NULL_TRACE):
+        cols = query["cols"]
+        table1 = query["table"]
+        join = query["join"]
+        join_table = join["table"]
+        left_tbl, left_col = join["left_tbl"], join["left_col"]
+        right_tbl, right_col = join["right_tbl"], join["right_col"]
+        where_condition = query["where"]
+        t1 = self.tables[table1]
+        t2 = self.tables[join_table]
+        jp = self._join_plan(query)
+        outer, inner = self.tables[jp["outer"]], self.tables[jp["inner"]]
+        filters = jp["filters"]
+        # The cost model may read the joined table first; output columns keep the FROM order.
+        swapped = jp["outer"] != table1
+        result = []
+
+        def emit(row1, row2):
+            if swapped:
+                row1, row2 = row2, row1
+            combined = {}
+            for col in t1.columns:
+                combined[f"{table1}.{col}"] = row1[col]
+            for col in t2.columns:
+                combined[f"{join_table}.{col}"] = row2[col]
+            result.append(combined)
+
+        with trace.node(self._join_operator(jp), self._join_detail(query, jp)) as node:
+            if jp["method"] == "loop":
+                rows1 = t1._matching_rows(None, trace)
+                rows2 = t2._matching_rows(None, trace)
+                for row1 in rows1:
+                    for row2 in rows2:
+                        val1 = row1[left_col] if left_tbl == table1 else row2[left_col]
+                        val2 = row2[right_col] if right_tbl == join_table else row1[right_col]
+                        if val1 == val2:
+                            emit(row1, row2)
+                node.scanned = len(rows1) * len(rows2)
+            elif jp["method"] == "index":
+                outer_col, inner_col = jp["keys"]
+                rows1 = outer._matching_rows(filters.get(jp["outer"]), trace)
+                inner_where = filters.get(jp["inner"])
+                with inner.lock, trace.node(*self._index_join_label(jp)) as scan_node:
+                    index = inner.indexes[inner_col]
+                    for row1 in rows1:
+                        rid = index.get(row1[outer_col])
+                        row2 = inner.heap.get(rid) if rid is not None else None
+                        if row2 is not None and _row_matches(row2, inner_where):
+                            emit(row1, row2)
+                    scan_node.loops = len(rows1)
+                    scan_node.scanned = len(rows1)
+                    scan_node.rows = len(result)
+                node.scanned = len(rows1)
+            else:
+                outer_col, inner_col = jp["keys"]
+                if not jp["parallel"]:
+                    rows1 = outer._matching_rows(filters.get(jp["outer"]), trace)
+                with trace.node("Hash", f"{jp['inner']}.{inner_col}") as hash_node:
+                    rows2 = inner._matching_rows(filters.get(jp["inner"]), trace)
+                    build = {}
+                    for j, row2 in enumerate(rows2):
+                        build.setdefault(row2[inner_col], []).append(j)
+                    hash_node.rows = len(rows2)
+                if jp["parallel"]:
+                    with outer.lock:
+                        rows1 = list(outer.rows)
+                        pairs = self.parallel.probe(outer, outer_col, build)
+                else:
+                    pairs = [(i, j) for i, row1 in enumerate(rows1) for j in build.get(row1[outer_col], ())]
+                for i, j in pairs:
+                    emit(rows1[i], rows2[j])
+                node.scanned = len(rows1)
+            node.rows = len(result)
+        if where_condition:
+            with trace.node("Filter", where_condition) as node:
                 filtered = []
                 conditions = [c.strip() for c in where_condition.split("AND")]
                 for row in result:
@@ -501,64 +1267,31 @@ class Database:
                             break
                     if ok:
                         filtered.append(row)
+                node.scanned = len(result)
+                node.rows = len(filtered)
                 result = filtered
-            final = []
-            if cols == ['*']:
-                final = result
-            else:
-                for row in result:
-                    out = {}
-                    for col in cols:
-                        if '.' in col:
-                            out[col] = row.get(col)
-                        else:
-                            found = False
-                            for k in row:
-                                if k.endswith(f".{col}"):
-                                    out[col] = row[k]
-                                    found = True
-                                    break
-                            if not found:
-                                out[col] = None
-                    final.append(out)
-            return final
+        final = []
+        if cols == ['*']:
+            final = result
         else:
-            if "WHERE" in rest.upper():
-                table1, where_condition = rest.split("WHERE",1)
-                table1 = table1.strip()
-                where_condition = where_condition.strip()
-            else:
-                table1 = rest.strip()
-                where_condition = None
-            if table1 not in self.tables:
-                raise Exception(f"Table {table1} does not exist")
-            tbl = self.tables[table1]
-            where_list = []
-            if where_condition:
-                conditions = [c.strip() for c in where_condition.split("AND")]
-                for cond in conditions:
-                    if '=' not in cond:
-                        raise Exception("Invalid WHERE condition")
-                    left, right = cond.split('=',1)
-                    left = left.strip()
-                    right = right.strip()
-                    if (right.startswith("'") and right.endswith("'")) or (right.startswith('"') and right.endswith('"')):
-                        right = right[1:-1]
-                    if left not in tbl.columns:
-                        raise Exception(f"Unknown column {left}")
-                    t = tbl.col_types[left]
-                    val = cast_value(right, t)
-                    where_list.append((left, val))
-            if cols == ['*']:
-                return tbl.select(tbl.columns, where=where_list)
-            else:
-                for c in cols:
-                    if c not in tbl.columns:
-                        raise Exception(f"Unknown column {c}")
-                return tbl.select(cols, where=where_list)
+            for row in result:
+                out = {}
+                for col in cols:
+                    if '.' in col:
+                        out[col] = row.get(col)
+                    else:
+                        found = False
+                        for k in row:
+                            if k.endswith(f".{col}"):
+                                out[col] = row[k]
+                                found = True
+                                break
+                        if not found:
+                            out[col] = None
+                final.append(out)
+        return final
 
-    def _exec_update(self, sql):
-        import re
+    def _parse_update(self, sql):
         pattern = re.compile(r'UPDATE\s+(\w+)\s+SET\s+(.+?)(?:\s+WHERE\s+(.+))?$', re.IGNORECASE)
         m = pattern.match(sql)
         if not m:
@@ -580,27 +1313,14 @@ class Database:
             if (val.startswith("'") and val.endswith("'")) or (val.startswith('"') and val.endswith('"')):
                 val = val[1:-1]
             set_values[col] = val
-        where_list = []
-        if where_part:
-            conditions = [c.strip() for c in where_part.split("AND")]
-            for cond in conditions:
-                if '=' not in cond:
-                    raise Exception("Invalid WHERE condition")
-                left, right = cond.split('=',1)
-                left = left.strip()
-                right = right.strip()
-                if (right.startswith("'") and right.endswith("'")) or (right.startswith('"') and right.endswith('"')):
-                    right = right[1:-1]
-                if left not in tbl.columns:
-                    raise Exception(f"Unknown column {left}")
-                t = tbl.col_types[left]
-                val = cast_value(right, t)
-                where_list.append((left, val))
-        count = tbl.update(set_values, where_list)
-        return count
+        where_list = self._parse_where(tbl, where_part)
+        return {"table": table, "set": set_values, "where": where_list}
 
-    def _exec_delete(self, sql):
-        import re
+    def _exec_update(self, query, trace=NULL_TRACE):
+        tbl = self.tables[query["table"]]
+        return tbl.update(query["set"], query["where"], trace=trace)
+
+    def _parse_delete(self, sql):
         pattern = re.compile(r'DELETE\s+FROM\s+(\w+)(?:\s+WHERE\s+(.+))?$', re.IGNORECASE)
         m = pattern.match(sql)
         if not m:
@@ -610,21 +1330,41 @@ class Database:
         if table not in self.tables:
             raise Exception(f"Table {table} does not exist")
         tbl = self.tables[table]
-        where_list = []
-        if where_part:
-            conditions = [c.strip() for c in where_part.split("AND")]
-            for cond in conditions:
-                if '=' not in cond:
-                    raise Exception("Invalid WHERE condition")
-                left, right = cond.split('=',1)
-                left = left.strip()
-                right = right.strip()
-                if (right.startswith("'") and right.endswith("'")) or (right.startswith('"') and right.endswith('"')):
-                    right = right[1:-1]
-                if left not in tbl.columns:
-                    raise Exception(f"Unknown column {left}")
-                t = tbl.col_types[left]
-                val = cast_value(right, t)
-                where_list.append((left, val))
-        count = tbl.delete(where_list if where_list else None)
-        return count
+        where_list = self._parse_where(tbl, where_part)
+        return {"table": table, "where": where_list}
+
+    def _exec_delete(self, query, trace=NULL_TRACE):
+        tbl = self.tables[query["table"]]
+        return tbl.delete(query["where"] if query["where"] else None, trace=trace)
+
+    def _parse_analyze(self, sql):
+        m = re.match(r'ANALYZE(?:\s+(\w+))?$', sql, re.IGNORECASE)
+        if not m:
+            raise Exception("Invalid ANALYZE syntax")
+        table = m.group(1)
+        if table is not None and table not in self.tables:
+            raise Exception(f"Table {table} does not exist")
+        return {"table": table}
+
+    def _analyze_targets(self, query):
+        return [query["table"]] if query["table"] else list(self.tables)
+
+    def _analyze_rows(self, parts):
+        # Streams each partition under its own lock instead of copying the table.
+        for part in parts:
+            with part.lock:
+                yield from part.heap.values()
+
+    def _exec_analyze(self, query, trace=NULL_TRACE):
+        names = self._analyze_targets(query)
+        for name in names:
+            tbl = self.tables[name]
+            parts = list(tbl.partitions.values()) if isinstance(tbl, PartitionedTable) else [tbl]
+            with trace.node(f"Analyze {name}") as node:
+                stats = planner.collect_statistics(tbl.codec, self._analyze_rows(parts))
+                node.scanned = node.rows = stats["rows"]
+            with self._lock:
+                self.statistics[name] = stats
+        with self._lock:
+            self.save_statistics()
+        return len(names)
@@ -0,0 +1,138 @@
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+slow_log = logging.getLogger("mini_db.slow")
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended.
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+
+
+def _bucket_labels():
+    labels = [f"<={b}ms" for b in LATENCY_BUCKETS_MS]
+    labels.append(f">{LATENCY_BUCKETS_MS[-1]}ms")
+    return labels
+
+
+def build_event(sql, trace, elapsed, result, error):
+    tokens = sql.split()
+    event = {
+        "statement": tokens[0].upper() if tokens else "",
+        "sql": sql,
+        "elapsed_ms": elapsed * 1000,
+        "rows_scanned": 0,
+        "rows_returned": 0,
+        "bytes_written": 0,
+        "index_probes": 0,
+        "seq_scans": 0,
+        "error": str(error) if error is not None else None,
+    }
+    for node in trace.nodes:
+        if node.operator.startswith("Index Scan"):
+            # An index nested loop probes once per outer row (loops).
+            event["index_probes"] += node.loops
+            event["rows_scanned"] += node.scanned
+        elif node.operator.startswith(("Seq Scan", "Parallel Seq Scan")):
+            # Only filtered scans could have used an index; full reads are not misses.
+            if node.detail:
+                event["seq_scans"] += 1
+            event["rows_scanned"] += node.scanned
+        event["bytes_written"] += node.bytes
+    if isinstance(result, list):
+        event["rows_returned"] = len(result)
+    elif isinstance(result, int):
+        event["rows_returned"] = result
+    elif isinstance(result, dict):
+        event["rows_returned"] = 1
+    return event
+
+
+class Metrics:
+    def __init__(self, slow_query_ms=None, slow_log_size=100):
+        self.slow_query_ms = slow_query_ms
+        self.slow_queries = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self.statements = {}
+        self.rows_scanned = 0
+        self.rows_returned = 0
+        self.bytes_written = 0
+        self.index_probes = 0
+        self.seq_scans = 0
+        self.slow_queries.clear()
+
+    def record(self, event):
+        with self._lock:
+            self._record(event)
+
+    def _record(self, event):
+        elapsed_ms = event["elapsed_ms"]
+        entry = self.statements.get(event["statement"])
+        if entry is None:
+            entry = {
+                "count": 0,
+                "errors": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "histogram": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+            }
+            self.statements[event["statement"]] = entry
+        entry["count"] += 1
+        if event["error"] is not None:
+            entry["errors"] += 1
+        entry["total_ms"] += elapsed_ms
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+        bucket = len(LATENCY_BUCKETS_MS)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                bucket = i
+                break
+        entry["histogram"][bucket] += 1
+        self.rows_scanned += event["rows_scanned"]
+        self.rows_returned += event["rows_returned"]
+        self.bytes_written += event["bytes_written"]
+        self.index_probes += event["index_probes"]
+        self.seq_scans += event["seq_scans"]
+        if self.slow_query_ms is not None and elapsed_ms >= self.slow_query_ms:
+            self.slow_queries.append({
+                "at": datetime.now().isoformat(),
+                "statement": event["statement"],
+                "elapsed_ms": elapsed_ms,
+                "sql": event["sql"],
+            })
+            slow_log.warning("slow query (%.3f ms): %s", elapsed_ms, event["sql"])
+
+    def snapshot(self):
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self):
+        labels = _bucket_labels()
+        statements = {}
+        for name, entry in self.statements.items():
+            statements[name] = {
+                "count": entry["count"],
+                "errors": entry["errors"],
+                "total_ms": entry["total_ms"],
+                "mean_ms": entry["total_ms"] / entry["count"],
+                "max_ms": entry["max_ms"],
+                "histogram": dict(zip(labels, entry["histogram"])),
+            }
+        lookups = self.index_probes + self.seq_scans
+        return {
+            "statements": statements,
+            "rows_scanned": self.rows_scanned,
+            "rows_returned": self.rows_returned,
+            "bytes_written": self.bytes_written,
+            "index_probes": self.index_probes,
+            "seq_scans": self.seq_scans,
+            "index_hit_rate": self.index_probes / lookups if lookups else None,
+            "slow_queries": list(self.slow_queries),
+        }
@@ -0,0 +1,224 @@
+import atexit
+import json
+import mmap
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from .codec import DECODERS
+
+# Tables above the threshold are exported once per table version, on a
+# background thread, to a column-major file: for every column, one JSON array
+# per row range. Until the export of the current version is ready, scans run
+# serially in the calling thread. Workers mmap the file and decode only the columns and range they were asked for, so
+# the rows themselves are never pickled to the pool; only filter values, the
+# join hash table and the (position or projected) results cross processes.
+
+_MAX_OPEN_MAPS = 8
+_open_maps = {}
+
+
+def _column(path, segment, col_type):
+    mm = _open_maps.get(path)
+    if mm is None:
+        if len(_open_maps) >= _MAX_OPEN_MAPS:
+            for old in _open_maps.values():
+                old.close()
+            _open_maps.clear()
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _open_maps[path] = mm
+    offset, length = segment
+    values = json.loads(mm[offset:offset + length])
+    decode = DECODERS.get(col_type)
+    if decode is not None:
+        values = [None if v is None else decode(v) for v in values]
+    return values
+
+
+def _scan_chunk(path, start, segments, col_types, where, columns):
+    needed = {col for col, _ in where}
+    if columns is not None:
+        needed.update(columns)
+    data = {col: _column(path, segments[col], col_types[col]) for col in needed}
+    count = len(next(iter(data.values())))
+    out = []
+    for i in range(count):
+        ok = True
+        for col, expected in where:
+            if data[col][i] != expected:
+                ok = False
+                break
+        if ok:
+            if columns is None:
+                out.append(start + i)
+            else:
+                out.append(tuple(data[col][i] for col in columns))
+    return out
+
+
+def _probe_chunk(path, start, segment, col_type, build):
+    out = []
+    for i, key in enumerate(_column(path, segment, col_type)):
+        matches = build.get(key)
+        if matches:
+            for j in matches:
+                out.append((start + i, j))
+    return out
+
+
+class ColumnSnapshot:
+    def __init__(self, path, bounds, segments):
+        self.path = path
+        self.bounds = bounds
+        self.segments = segments
+
+
+class ParallelExecutor:
+    def __init__(self, workers, threshold=100000):
+        self.workers = workers
+        self.threshold = threshold
+        self._pool = None
+        self._dir = None
+        self._snapshots = {}
+        self._builds = {}
+        self._lock = threading.Lock()
+        atexit.register(self.shutdown)
+
+    def applies(self, row_count):
+        return self.workers > 0 and row_count > 0 and row_count >= self.threshold
+
+    def _get_pool(self):
+        with self._lock:
+            return self._start_pool()
+
+    def _start_pool(self):
+        if self._pool is None:
+            # spawn, not fork: the server and Django run threads, which fork does not copy safely
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def current(self, table):
+        cached = self._snapshots.get(table.name)
+        return cached is not None and cached[0] == table.version
+
+    def prepare(self, table):
+        # True if the table's export is up to date. Otherwise start exporting
+        # it on a background thread and return False, so the caller scans
+        # serially instead of paying for the export while holding the table
+        # lock. Rows are replaced on update, never changed in place, so a
+        # shallow copy of the row list taken under the lock is a consistent
+        # version to export.
+        with table.lock, self._lock:
+            if self.current(table):
+                return True
+            if table.name not in self._builds:
+                thread = threading.Thread(target=self._export_in_background,
+                                          args=(table, table.rows, table.version),
+                                          name=f"mini_db-export-{table.name}", daemon=True)
+                self._builds[table.name] = thread
+                thread.start()
+            return False
+
+    def wait(self):
+        # Block until every background export has finished.
+        for thread in list(self._builds.values()):
+            thread.join()
+
+    def _export_in_background(self, table, rows, version):
+        try:
+            with self._lock:
+                directory = self._export_dir()
+            snapshot = self._export(table, rows, directory)
+            with self._lock:
+                self._store(table, version, snapshot)
+        finally:
+            with self._lock:
+                self._builds.pop(table.name, None)
+
+    def _snapshot(self, table):
+        # The caller holds the table lock. A write that slipped in after
+        # planning makes the export stale; rebuild it here so the positions
+        # the workers return match the rows the caller is looking at.
+        with self._lock:
+            cached = self._snapshots.get(table.name)
+            if cached is not None and cached[0] == table.version:
+                return cached[1]
+            snapshot = self._export(table, table.rows, self._export_dir())
+            self._store(table, table.version, snapshot)
+            return snapshot
+
+    def _export_dir(self):
+        if self._dir is None:
+            self._dir = tempfile.mkdtemp(prefix="mini_db_parallel_")
+        return self._dir
+
+    def _store(self, table, version, snapshot):
+        cached = self._snapshots.get(table.name)
+        if cached is not None and cached[0] > version:
+            # A newer export finished first; keep it.
+            os.unlink(snapshot.path)
+            return
+        if cached is not None:
+            os.unlink(cached[1].path)
+        self._snapshots[table.name] = (version, snapshot)
+
+    def _export(self, table, rows, directory):
+        chunks = self.workers * 2
+        size = max(-(-len(rows) // chunks), 1)
+        bounds = [(i, min(i + size, len(rows))) for i in range(0, len(rows), size)]
+        segments = [{} for _ in bounds]
+        fd, path = tempfile.mkstemp(prefix=f"{table.name}.", suffix=".cols", dir=directory)
+        offset = 0
+        with os.fdopen(fd, "wb") as f:
+            for col in table.columns:
+                for n, (start, end) in enumerate(bounds):
+                    values = table.codec.encode_column(col, [row[col] for row in rows[start:end]])
+                    payload = json.dumps(values).encode("utf-8")
+                    f.write(payload)
+                    segments[n][col] = (offset, len(payload))
+                    offset += len(payload)
+        return ColumnSnapshot(path, bounds, segments)
+
+    def scan(self, table, where, columns=None):
+        # Returns matching row positions, or projected tuples when columns are given.
+        snapshot = self._snapshot(table)
+        pool = self._get_pool()
+        futures = [
+            pool.submit(_scan_chunk, snapshot.path, start, segments, table.col_types, list(where), columns)
+            for (start, _), segments in zip(snapshot.bounds, snapshot.segments)
+        ]
+        out = []
+        for future in futures:
+            out.extend(future.result())
+        return out
+
+    def probe(self, table, col, build):
+        # Returns (position in table, value from build) pairs in table order.
+        snapshot = self._snapshot(table)
+        pool = self._get_pool()
+        futures = [
+            pool.submit(_probe_chunk, snapshot.path, start, segments[col], table.col_types[col], build)
+            for (start, _), segments in zip(snapshot.bounds, snapshot.segments)
+        ]
+        out = []
+        for future in futures:
+            out.extend(future.result())
+        return out
+
+    def shutdown(self):
+        self.wait()
+        with self._lock:
+            self._shutdown()
+
+    def _shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+        self._snapshots.clear()
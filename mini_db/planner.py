@@ -0,0 +1,120 @@
+# Column statistics gathered by ANALYZE, and the cost model the join planner
+# uses once both sides of a join have been analyzed. Costs are in units of one
+# row read by a sequential scan; only their relative size matters.
+
+import random
+
+HISTOGRAM_BUCKETS = 10
+# Rows kept for the histograms; larger tables are sampled.
+SAMPLE_ROWS = 10000
+# Assumed fraction of rows matching `col = value` when nothing better is known.
+DEFAULT_SELECTIVITY = 0.1
+
+SEQ_ROW_COST = 1.0
+INDEX_PROBE_COST = 3.0
+HASH_BUILD_COST = 2.0
+HASH_PROBE_COST = 1.0
+PARALLEL_STARTUP_COST = 1000.0
+
+
+def _histogram(values):
+    # Equi-depth: roughly the same number of rows falls between neighbouring bounds.
+    non_null = sorted(v for v in values if v is not None)
+    if not non_null:
+        return []
+    buckets = min(HISTOGRAM_BUCKETS, len(non_null))
+    return [non_null[i * len(non_null) // buckets] for i in range(buckets)] + [non_null[-1]]
+
+
+def collect_statistics(codec, rows):
+    # `rows` is read once, so it can stream straight from a heap. Row and null
+    # counts and distinct values are exact; histograms come from a reservoir
+    # sample of SAMPLE_ROWS rows (seeded, so ANALYZE is repeatable).
+    total = 0
+    nulls = {col: 0 for col in codec.columns}
+    distinct = {col: set() for col in codec.columns}
+    sample = []
+    rng = random.Random(0)
+    for row in rows:
+        total += 1
+        for col in codec.columns:
+            value = row[col]
+            if value is None:
+                nulls[col] += 1
+            else:
+                distinct[col].add(value)
+        if len(sample) < SAMPLE_ROWS:
+            sample.append(row)
+        else:
+            slot = rng.randrange(total)
+            if slot < SAMPLE_ROWS:
+                sample[slot] = row
+    return {
+        "rows": total,
+        "columns": {
+            col: {
+                "distinct": len(distinct[col]),
+                "null_frac": nulls[col] / total if total else 0.0,
+                # Histogram bounds are stored encoded (JSON-ready).
+                "histogram": codec.encode_column(col, _histogram(row[col] for row in sample)),
+            }
+            for col in codec.columns
+        },
+    }
+
+
+def selectivity(col_stats, value):
+    # Fraction of rows with `col = value`; `value` is encoded like the histogram.
+    if col_stats is None:
+        return DEFAULT_SELECTIVITY
+    if value is None:
+        return col_stats["null_frac"]
+    histogram = col_stats["histogram"]
+    if histogram:
+        try:
+            if value < histogram[0] or value > histogram[-1]:
+                return 0.0
+        except TypeError:
+            pass
+    if not col_stats["distinct"]:
+        return 0.0
+    return (1.0 - col_stats["null_frac"]) / col_stats["distinct"]
+
+
+def _unique_probe(table, where):
+    unique = {table.primary_key, *table.unique_cols}
+    return any(col in unique for col, _ in where)
+
+
+def estimate_rows(table, where, stats):
+    rows = table.row_count()
+    if not where or not rows:
+        return rows
+    if _unique_probe(table, where):
+        return 1
+    columns = stats["columns"] if stats else {}
+    fraction = 1.0
+    for col, value in where:
+        fraction *= selectivity(columns.get(col), table.codec.encode_column(col, [value])[0])
+    # Never plan for zero rows: statistics can be stale.
+    return max(1.0, rows * fraction)
+
+
+def scan_cost(table, where):
+    if where and _unique_probe(table, where):
+        return INDEX_PROBE_COST
+    return table.row_count() * SEQ_ROW_COST
+
+
+def hash_join_cost(outer_rows, inner_rows):
+    return inner_rows * HASH_BUILD_COST + outer_rows * HASH_PROBE_COST
+
+
+def parallel_hash_join_cost(outer_rows, inner_rows, workers):
+    # Workers scan and probe the outer table; the build stays in this process.
+    return (PARALLEL_STARTUP_COST + inner_rows * HASH_BUILD_COST
+            + outer_rows * (SEQ_ROW_COST + HASH_PROBE_COST) / workers)
+
+
+def index_join_cost(outer_rows):
+    return outer_rows * INDEX_PROBE_COST
@@ -0,0 +1,48 @@
+import json
+import struct
+from datetime import datetime
+
+# Every message is a 4-byte big-endian length followed by that many bytes of
+# UTF-8 JSON. Requests are {"id", "sql"}; responses are {"id", "ok", "result"}
+# or {"id", "ok": false, "error"}. Responses come back in request order, so a
+# client may pipeline several requests before reading.
+HEADER = struct.Struct(">I")
+MAX_FRAME = 64 * 1024 * 1024
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+def _object_hook(obj):
+    if len(obj) == 1 and "$datetime" in obj:
+        return datetime.fromisoformat(obj["$datetime"])
+    return obj
+
+
+def encode(message):
+    payload = json.dumps(message, default=_default).encode("utf-8")
+    return HEADER.pack(len(payload)) + payload
+
+
+def decode(payload):
+    return json.loads(payload.decode("utf-8"), object_hook=_object_hook)
+
+
+def frame_length(header):
+    (length,) = HEADER.unpack(header)
+    if length > MAX_FRAME:
+        raise ValueError(f"Frame of {length} bytes exceeds limit of {MAX_FRAME}")
+    return length
+
+
+def parse_address(address):
+    # "unix:/path/to.sock" or "host:port"
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Invalid address {address!r}; use host:port or unix:/path")
+    return "tcp", (host, int(port))
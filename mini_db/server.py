@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import logging
+import os
+
+from . import protocol
+from .database import Database
+
+logger = logging.getLogger("mini_db.server")
+
+
+async def _handle(db, reader, writer):
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                header = await reader.readexactly(protocol.HEADER.size)
+                payload = await reader.readexactly(protocol.frame_length(header))
+            except asyncio.IncompleteReadError:
+                break
+            request = protocol.decode(payload)
+            if not isinstance(request, dict) or not isinstance(request.get("sql"), str):
+                response = {"id": request.get("id") if isinstance(request, dict) else None, "ok": False,
+                            "error": "Request must be a JSON object with an 'sql' string"}
+                writer.write(protocol.encode(response))
+                await writer.drain()
+                continue
+            response = {"id": request.get("id")}
+            try:
+                # execute() blocks and serialises statements itself; keep it off the loop.
+                result = await loop.run_in_executor(None, db.execute, request["sql"])
+                response["ok"] = True
+                response["result"] = result
+            except Exception as e:
+                response["ok"] = False
+                response["error"] = str(e)
+            writer.write(protocol.encode(response))
+            await writer.drain()
+    except (ConnectionError, ValueError) as e:
+        logger.warning("closing connection: %s", e)
+    finally:
+        writer.close()
+
+
+async def start_server(db, address):
+    kind, target = protocol.parse_address(address)
+    handler = lambda reader, writer: _handle(db, reader, writer)
+    if kind == "unix":
+        if os.path.exists(target):
+            os.unlink(target)
+        return await asyncio.start_unix_server(handler, path=target)
+    host, port = target
+    return await asyncio.start_server(handler, host=host, port=port)
+
+
+async def serve(db, address):
+    server = await start_server(db, address)
+    logger.info("mini_db listening on %s", address)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve one mini_db Database over TCP or a Unix socket")
+    parser.add_argument("--listen", default="127.0.0.1:7433", help="host:port or unix:/path/to.sock")
+    parser.add_argument("--catalog", default="catalog.json")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--durability", choices=["immediate", "deferred"], default="immediate",
+                        help="deferred: write changed tables every --flush-interval seconds instead of per statement")
+    parser.add_argument("--flush-interval", type=float, default=1.0)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    db = Database(catalog_file=args.catalog, data_dir=args.data_dir, durability=args.durability,
+                  flush_interval=args.flush_interval)
+    try:
+        asyncio.run(serve(db, args.listen))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
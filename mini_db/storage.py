@@ -0,0 +1,494 @@
+import json
+import os
+import re
+import shutil
+import zlib
+
+# A heap holds a table's rows and hands out row ids: indexes store the id,
+# never the row itself, so rows can live outside memory.
+
+# Log records since the last checkpoint are replayed on every open; once the
+# log outgrows the snapshot (and this floor) the table is checkpointed.
+CHECKPOINT_MIN_LOG_BYTES = 1 << 16
+
+
+# Every storage write and rename goes through these helpers, so crash tests can interpose on them.
+def write_file(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def append_file(path, data):
+    with open(path, "ab") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def replace_file(src, dst):
+    os.replace(src, dst)
+
+
+def _checksum(data):
+    return "crc32:%08x" % zlib.crc32(data)
+
+
+def _append_record(path, ops):
+    # One statement's changes as one fsynced "crc32 [ops]" line.
+    body = json.dumps(ops).encode("utf-8")
+    record = b"%08x %s\n" % (zlib.crc32(body), body)
+    append_file(path, record)
+    return len(record)
+
+
+def _decode_record(line):
+    if not line.endswith(b"\n"):
+        return None
+    crc, _, body = line[:-1].partition(b" ")
+    try:
+        if int(crc, 16) != zlib.crc32(body):
+            return None
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def _replay_log(path, owner, apply):
+    # Applies every record in order and returns the log's length in bytes.
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as f:
+        data = f.read()
+    lines = data.splitlines(keepends=True)
+    good = 0
+    for n, line in enumerate(lines):
+        ops = _decode_record(line)
+        if ops is None:
+            if n == len(lines) - 1:
+                # A statement cut off mid-write never returned to its caller: drop it.
+                break
+            raise Exception(f"{owner}: change log {path} is damaged at byte {good}")
+        apply(ops)
+        good += len(line)
+    if good < len(data):
+        with open(path, "r+b") as f:
+            f.truncate(good)
+    return good
+
+
+class MemoryHeap:
+    # Every row in memory; row ids are integers. On disk, a table is three files:
+    #   <name>.json           snapshot: {"next_rid", "rids": [...], "rows": [...]}
+    #   <name>.<gen>.log      change log: one "crc32 [ops]" line per statement since the snapshot
+    #   <name>.manifest       the current generation, snapshot checksum and log name
+    # A checkpoint writes the snapshot to <name>.json.tmp, commits it by replacing
+    # the manifest, then renames it into place and drops the old log. Recovery
+    # finishes an interrupted rename, verifies the checksum and replays the log.
+    def __init__(self, data_dir, name, codec, log_changes=True):
+        self.data_dir = data_dir
+        self.name = name
+        self.codec = codec
+        # False for deferred durability: changes reach disk only at checkpoints.
+        self.log_changes = log_changes
+        self.snapshot_path = os.path.join(data_dir, f"{name}.json")
+        self.manifest_path = os.path.join(data_dir, f"{name}.manifest")
+        self.rows = {}
+        self._next_rid = 0
+        self._pending = []
+        self.generation = 0
+        self.changed = False
+        self.snapshot_bytes = 0
+        self.log_bytes = 0
+
+    def _log_path(self, generation):
+        return os.path.join(self.data_dir, f"{self.name}.{generation}.log")
+
+    def exists(self):
+        return os.path.exists(self.manifest_path) or os.path.exists(self.snapshot_path)
+
+    def delete_files(self):
+        # The manifest goes last: until it is gone, exists() still finds the table.
+        pattern = re.compile(rf"{re.escape(self.name)}\.\d+\.log$")
+        for entry in os.listdir(self.data_dir):
+            if pattern.match(entry):
+                os.remove(os.path.join(self.data_dir, entry))
+        for path in (self.snapshot_path + ".tmp", self.snapshot_path, self.manifest_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def load(self):
+        manifest = self._read_manifest()
+        if manifest is None:
+            # No manifest: a new table, or one saved before checkpoints existed (a plain list of rows).
+            if os.path.exists(self.snapshot_path):
+                with open(self.snapshot_path, "rb") as f:
+                    data = f.read()
+                data = self._parse(data, self.snapshot_path)
+                if isinstance(data, dict):
+                    data = data["rows"]
+                for row in data:
+                    self.rows[self._next_rid] = self.codec.decode_row(row)
+                    self._next_rid += 1
+            self.changed = True
+            self.checkpoint()
+        else:
+            self._recover(manifest)
+        return self.rows.items()
+
+    def _read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return None
+        with open(self.manifest_path, "rb") as f:
+            return self._parse(f.read(), self.manifest_path)
+
+    def _parse(self, data, path):
+        try:
+            return json.loads(data)
+        except ValueError as e:
+            raise Exception(f"Table {self.name}: {path} is damaged ({e}); refusing to start it empty")
+
+    def _recover(self, manifest):
+        tmp = self.snapshot_path + ".tmp"
+        if os.path.exists(tmp):
+            with open(tmp, "rb") as f:
+                data = f.read()
+            if _checksum(data) == manifest["checksum"]:
+                # Crashed after committing the manifest but before the rename.
+                replace_file(tmp, self.snapshot_path)
+            else:
+                os.remove(tmp)
+        with open(self.snapshot_path, "rb") as f:
+            data = f.read()
+        if _checksum(data) != manifest["checksum"]:
+            raise Exception(f"Table {self.name}: {self.snapshot_path} does not match its manifest checksum")
+        snapshot = self._parse(data, self.snapshot_path)
+        decode_row = self.codec.decode_row
+        rows = snapshot["rows"]
+        for row in rows:
+            decode_row(row)
+        self.rows = dict(zip(snapshot["rids"], rows))
+        self._next_rid = snapshot["next_rid"]
+        self.generation = manifest["generation"]
+        self.snapshot_bytes = len(data)
+        self._replay(self._log_path(self.generation))
+        pattern = re.compile(rf"{re.escape(self.name)}\.(\d+)\.log$")
+        for entry in os.listdir(self.data_dir):
+            m = pattern.match(entry)
+            if m and int(m.group(1)) != self.generation:
+                os.remove(os.path.join(self.data_dir, entry))
+
+    def _replay(self, path):
+        good = _replay_log(path, f"Table {self.name}", self._apply)
+        self.log_bytes = good
+        self.changed = self.changed or good > 0
+
+    def _apply(self, ops):
+        decode_row = self.codec.decode_row
+        for op in ops:
+            if op[0] == "d":
+                for rid in op[1]:
+                    del self.rows[rid]
+            else:
+                rid = op[1]
+                self.rows[rid] = decode_row(op[2])
+                self._next_rid = max(self._next_rid, rid + 1)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def scan(self):
+        return self.rows.items()
+
+    def values(self):
+        return self.rows.values()
+
+    def get(self, rid):
+        return self.rows.get(rid)
+
+    def append(self, row):
+        rid = self._next_rid
+        self._next_rid += 1
+        self.rows[rid] = row
+        self.changed = True
+        if self.log_changes:
+            self._pending.append(["i", rid, self.codec.encode_row(row)])
+        return rid
+
+    def replace(self, rid, row):
+        self.rows[rid] = row
+        self.changed = True
+        if self.log_changes:
+            self._pending.append(["u", rid, self.codec.encode_row(row)])
+
+    def remove(self, rids):
+        for rid in rids:
+            del self.rows[rid]
+        self.changed = True
+        if self.log_changes:
+            self._pending.append(["d", list(rids)])
+
+    def flush(self):
+        # Appends this statement's changes to the log as one record.
+        if not self._pending:
+            return 0
+        written = _append_record(self._log_path(self.generation), self._pending)
+        self._pending = []
+        self.log_bytes += written
+        return written
+
+    def needs_checkpoint(self):
+        return self.log_bytes > max(self.snapshot_bytes, CHECKPOINT_MIN_LOG_BYTES)
+
+    def checkpoint(self):
+        if not self.changed:
+            return 0
+        encode_row = self.codec.encode_row
+        snapshot = {
+            "next_rid": self._next_rid,
+            "rids": list(self.rows),
+            "rows": [encode_row(row) for row in self.rows.values()],
+        }
+        payload = json.dumps(snapshot, separators=(",", ":")).encode("utf-8")
+        if not os.path.exists(self.data_dir):
+            os.makedirs(self.data_dir)
+        tmp = self.snapshot_path + ".tmp"
+        write_file(tmp, payload)
+        generation = self.generation + 1
+        manifest = {
+            "generation": generation,
+            "snapshot": os.path.basename(self.snapshot_path),
+            "checksum": _checksum(payload),
+            "rows": len(self.rows),
+            "log": os.path.basename(self._log_path(generation)),
+        }
+        write_file(self.manifest_path + ".tmp", json.dumps(manifest, indent=2).encode("utf-8"))
+        replace_file(self.manifest_path + ".tmp", self.manifest_path)
+        replace_file(tmp, self.snapshot_path)
+        old_log = self._log_path(self.generation)
+        if os.path.exists(old_log):
+            os.remove(old_log)
+        self.generation = generation
+        self._pending = []
+        self.changed = False
+        self.snapshot_bytes = len(payload)
+        self.log_bytes = 0
+        return len(payload)
+
+
+class PagedHeap:
+    # Rows in fixed-size pages, one JSON file per page under `directory`, read
+    # and cached through a shared BufferPool. Row ids are (page, slot); deleted
+    # slots are left empty, so ids never move.
+    #
+    # Like MemoryHeap, each statement's changes are appended to a change log
+    # (`directory`/changes.log) as one record. Pages a statement changes stay
+    # pinned until that record is written, so the pool never writes back half
+    # a statement; after that they are written back on eviction or at a
+    # checkpoint, which then deletes the log. Opening replays the log over the
+    # pages. Every change sets a whole slot, so replaying a record whose pages
+    # were already written back is harmless.
+    def __init__(self, directory, codec, pool, page_size=256, log_changes=True, legacy=None):
+        self.directory = directory
+        self.codec = codec
+        self.pool = pool
+        self.page_size = page_size
+        # False for deferred durability: nothing is logged and pages are written back freely.
+        self.log_changes = log_changes
+        # The table's single-file heap, imported on the first paged open and then deleted.
+        self.legacy = legacy
+        self.page_count = 0
+        self.count = 0
+        self._pending = []
+        # Pages changed since the last log record, pinned until flush(): page_no -> page.
+        self._held = {}
+        self.log_bytes = 0
+
+    def _page_path(self, page_no):
+        return os.path.join(self.directory, f"{page_no:08d}.json")
+
+    def _log_path(self):
+        return os.path.join(self.directory, "changes.log")
+
+    def load(self):
+        if not os.path.exists(self.directory):
+            if self.legacy is not None and self.legacy.exists():
+                yield from self._import_legacy()
+                return
+            os.makedirs(self.directory)
+        elif self.legacy is not None and self.legacy.exists():
+            # An import that stopped after the rename; the pages are complete.
+            self.legacy.delete_files()
+        while os.path.exists(self._page_path(self.page_count)):
+            self.page_count += 1
+        owner = f"Table {os.path.splitext(os.path.basename(self.directory))[0]}"
+        self.log_bytes = _replay_log(self._log_path(), owner, self._apply)
+        for rid, row in self.scan():
+            self.count += 1
+            yield rid, row
+
+    def _import_legacy(self):
+        # Pages are built in a temporary directory and renamed into place once
+        # all of them are on disk, so an interrupted import leaves nothing that
+        # the next open would mistake for the table. Only then is the old file
+        # deleted.
+        final = self.directory
+        self.directory = final + ".tmp"
+        if os.path.exists(self.directory):
+            shutil.rmtree(self.directory)
+        os.makedirs(self.directory)
+        # The rename below commits the whole import, so it is not logged.
+        log_changes, self.log_changes = self.log_changes, False
+        try:
+            imported = [(self.append(row), row) for _, row in list(self.legacy.load())]
+            self.pool.flush(self)
+        finally:
+            # The pool keys pages by directory; drop them before it changes back.
+            self.pool.discard(self)
+            self.directory = final
+            self.log_changes = log_changes
+        replace_file(final + ".tmp", final)
+        self.legacy.delete_files()
+        yield from imported
+
+    def __len__(self):
+        return self.count
+
+    def read_page(self, page_no):
+        path = self._page_path(page_no)
+        with open(path, "r") as f:
+            try:
+                data = json.load(f)
+            except ValueError as e:
+                raise Exception(f"Page {path} is damaged ({e})")
+        decode_row = self.codec.decode_row
+        return [None if row is None else decode_row(row) for row in data]
+
+    def write_page(self, page_no, slots):
+        # Written beside the page and renamed over it, so a crash never leaves half a page.
+        encode_row = self.codec.encode_row
+        payload = json.dumps([None if row is None else encode_row(row) for row in slots]).encode("utf-8")
+        path = self._page_path(page_no)
+        write_file(path + ".tmp", payload)
+        replace_file(path + ".tmp", path)
+        return len(payload)
+
+    def scan(self):
+        # Pins one page at a time; rows are copied out before the page is released.
+        for page_no in range(self.page_count):
+            page = self.pool.pin(self, page_no)
+            try:
+                items = [((page_no, slot), row) for slot, row in enumerate(page.slots) if row is not None]
+            finally:
+                self.pool.unpin(page)
+            yield from items
+
+    def values(self):
+        for _, row in self.scan():
+            yield row
+
+    def get(self, rid):
+        page_no, slot = rid
+        page = self.pool.pin(self, page_no)
+        try:
+            return page.slots[slot]
+        finally:
+            self.pool.unpin(page)
+
+    def append(self, row):
+        page_no = self.page_count - 1
+        page = self.pool.pin(self, page_no) if page_no >= 0 else None
+        if page is None or len(page.slots) >= self.page_size:
+            if page is not None:
+                self.pool.unpin(page)
+            page_no = self.page_count
+            page = self.pool.pin(self, page_no, create=True)
+            self.page_count += 1
+        try:
+            page.slots.append(row)
+            slot = len(page.slots) - 1
+        finally:
+            self._release(page)
+        self.count += 1
+        if self.log_changes:
+            self._pending.append(["i", [page_no, slot], self.codec.encode_row(row)])
+        return page_no, slot
+
+    def replace(self, rid, row):
+        page_no, slot = rid
+        page = self.pool.pin(self, page_no)
+        try:
+            page.slots[slot] = row
+        finally:
+            self._release(page)
+        if self.log_changes:
+            self._pending.append(["u", [page_no, slot], self.codec.encode_row(row)])
+
+    def remove(self, rids):
+        for page_no, slot in rids:
+            page = self.pool.pin(self, page_no)
+            try:
+                page.slots[slot] = None
+            finally:
+                self._release(page)
+            self.count -= 1
+        if self.log_changes:
+            self._pending.append(["d", [list(rid) for rid in rids]])
+
+    def _release(self, page):
+        # The first change to a page keeps its pin until flush().
+        if self.log_changes and page.page_no not in self._held:
+            self._held[page.page_no] = page
+        else:
+            self.pool.unpin(page, dirty=True)
+
+    def _apply(self, ops):
+        decode_row = self.codec.decode_row
+        for op in ops:
+            if op[0] == "d":
+                for page_no, slot in op[1]:
+                    self._set(page_no, slot, None)
+            else:
+                page_no, slot = op[1]
+                self._set(page_no, slot, decode_row(op[2]))
+
+    def _set(self, page_no, slot, row):
+        # Replay only: records are in order, so a new page always follows the last one.
+        create = page_no >= self.page_count
+        page = self.pool.pin(self, page_no, create=create)
+        if create:
+            self.page_count = page_no + 1
+        try:
+            if slot >= len(page.slots):
+                page.slots.extend([None] * (slot + 1 - len(page.slots)))
+            page.slots[slot] = row
+        finally:
+            self.pool.unpin(page, dirty=True)
+
+    def flush(self):
+        # Appends this statement's changes to the log as one record; only then
+        # may the pool write back the pages they touched.
+        written = 0
+        if self._pending:
+            written = _append_record(self._log_path(), self._pending)
+            self._pending = []
+            self.log_bytes += written
+        if self._held:
+            for page in self._held.values():
+                self.pool.unpin(page, dirty=True)
+            self._held = {}
+            self.pool.shrink()
+        return written
+
+    def needs_checkpoint(self):
+        return self.log_bytes > CHECKPOINT_MIN_LOG_BYTES
+
+    def checkpoint(self):
+        # Writes back every changed page, after which the log is no longer needed.
+        written = self.flush()
+        written += self.pool.flush(self)
+        if os.path.exists(self._log_path()):
+            os.remove(self._log_path())
+        self.log_bytes = 0
+        return written
@@ -0,0 +1,87 @@
+import time
+
+
+class TraceNode:
+    __slots__ = ("trace", "operator", "detail", "depth", "rows", "loops", "scanned", "bytes", "elapsed", "_start")
+
+    def __init__(self, trace, operator, detail="", depth=0):
+        self.trace = trace
+        self.operator = operator
+        self.detail = detail
+        self.depth = depth
+        self.rows = 0
+        self.loops = 0
+        self.scanned = 0
+        self.bytes = 0
+        self.elapsed = 0.0
+        self._start = None
+
+    def __enter__(self):
+        self.loops += 1
+        self.trace.depth += 1
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed += time.perf_counter() - self._start
+        self.trace.depth -= 1
+        return False
+
+    def label(self):
+        text = "  " * self.depth + ("-> " if self.depth else "") + self.operator
+        if self.detail:
+            text += f"  ({self.detail})"
+        return text
+
+
+class Trace:
+    def __init__(self):
+        self.nodes = []
+        self.depth = 0
+
+    def node(self, operator, detail=""):
+        n = TraceNode(self, operator, detail, self.depth)
+        self.nodes.append(n)
+        return n
+
+    def add(self, operator, detail="", depth=0):
+        n = TraceNode(self, operator, detail, depth)
+        self.nodes.append(n)
+        return n
+
+    def extend(self, other):
+        # Adopts another trace's nodes, e.g. the statement run by EXPLAIN ANALYZE.
+        self.nodes.extend(other.nodes)
+
+    def format(self, analyze=False):
+        lines = []
+        for n in self.nodes:
+            text = n.label()
+            if analyze:
+                text += f"  (actual time={n.elapsed * 1000:.3f} ms rows={n.rows} loops={n.loops})"
+            lines.append(text)
+        return lines
+
+
+class _NullNode:
+    # Shared sink used when nobody is tracing; attribute writes are harmless.
+    rows = loops = scanned = bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class _NullTrace:
+    _node = _NullNode()
+
+    def node(self, operator, detail=""):
+        return self._node
+
+    def extend(self, other):
+        pass
+
+
+NULL_TRACE = _NullTrace()
@@ -19,8 +19,28 @@ def print_table(rows):
         line = " | ".join(str(row.get(col, "")).ljust(widths[col]) for col in cols)
         print(line)
 
+def print_stats(db):
+    stats = db.stats()
+    rows = []
+    for name, entry in sorted(stats["statements"].items()):
+        rows.append({
+            "statement": name,
+            "count": entry["count"],
+            "errors": entry["errors"],
+            "mean_ms": f"{entry['mean_ms']:.3f}",
+            "max_ms": f"{entry['max_ms']:.3f}",
+        })
+    print_table(rows)
+    hit_rate = stats["index_hit_rate"]
+    print(f"rows scanned: {stats['rows_scanned']}, rows returned: {stats['rows_returned']}")
+    print(f"bytes written: {stats['bytes_written']}")
+    print(f"index hit rate: {'n/a' if hit_rate is None else f'{hit_rate:.1%}'}")
+    if stats["slow_queries"]:
+        print("slow queries:")
+        print_table([{"elapsed_ms": f"{q['elapsed_ms']:.3f}", "sql": q["sql"]} for q in stats["slow_queries"]])
+
 def main():
-    db = Database()
+    db = Database(metrics=True, slow_query_ms=100)
     try:
         while True:
             s = input("mini_db> ").strip()
@@ -28,6 +48,12 @@ def main():
                 continue
             if s.lower() in ("exit", "quit"):
                 break
+            if s.lower() == "stats":
+                print_stats(db)
+                continue
+            if s.lower() == "stats reset":
+                db.reset_stats()
+                continue
             try:
                 result = db.execute(s)
                 if isinstance(result, list):
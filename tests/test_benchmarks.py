@@ -0,0 +1,16 @@
+import os
+from benchmarks.run import WORKLOADS, compare, run_benchmarks
+
+def test_run_benchmarks_covers_every_workload(tmp_path):
+    os.chdir(tmp_path)
+    report = run_benchmarks([20], repeat=1)
+    assert set(report["results"]["20"]) == set(WORKLOADS)
+    assert os.getcwd() == str(tmp_path)
+    assert os.listdir(tmp_path) == []
+
+def test_compare_flags_regressions():
+    base = {"results": {"1000": {"pk_lookup": {"median_ms": 1.0}, "join": {"median_ms": 10.0}}}}
+    new = {"results": {"1000": {"pk_lookup": {"median_ms": 1.05}, "join": {"median_ms": 20.0}}}}
+    rows = {row["workload"]: row for row in compare(base, new, threshold=0.2)}
+    assert not rows["pk_lookup"]["regression"]
+    assert rows["join"]["regression"]
@@ -0,0 +1,76 @@
+import os
+import pytest
+from mini_db import storage
+from mini_db.database import Database
+
+def test_paged_table_stays_within_buffer_pool(tmp_path):
+    os.chdir(tmp_path)
+    db = Database(buffer_pool_pages=2, page_size=4, metrics=True)
+    db.execute("CREATE TABLE users (id INT PRIMARY KEY, name TEXT UNIQUE, age INT)")
+    db.execute("CREATE TABLE posts (id INT PRIMARY KEY, user_id INT)")
+    for i in range(1, 21):
+        db.execute(f"INSERT INTO users VALUES ({i}, 'u{i}', {i % 3})")
+        db.execute(f"INSERT INTO posts VALUES ({i}, {21 - i})")
+    assert len(os.listdir(tmp_path / "data" / "users.pages")) == 5
+    assert db.buffer_pool.resident() <= 2
+    assert db.execute("SELECT name FROM users WHERE id = 3") == [{'name': 'u3'}]
+    assert [r["id"] for r in db.execute("SELECT id FROM users WHERE age = 0")] == [3, 6, 9, 12, 15, 18]
+    joined = db.execute("SELECT users.name, posts.id FROM users INNER JOIN posts ON users.id = posts.user_id")
+    assert len(joined) == 20
+    assert db.execute("UPDATE users SET name = 'three' WHERE id = 3") == 1
+    with pytest.raises(Exception) as excinfo:
+        db.execute("UPDATE users SET name = 'three' WHERE id = 4")
+    assert "UNIQUE constraint failed" in str(excinfo.value)
+    assert db.execute("DELETE FROM users WHERE age = 1") == 7
+    assert db.buffer_pool.resident() <= 2
+    stats = db.stats()["buffer_pool"]
+    assert stats["evictions"] > 0 and stats["misses"] > 0
+    db.close()
+
+    db = Database(buffer_pool_pages=2, page_size=4)
+    assert db.execute("SELECT name FROM users WHERE id = 3") == [{'name': 'three'}]
+    assert len(db.execute("SELECT * FROM users")) == 13
+    db.execute("INSERT INTO users VALUES (1, 'again', 0)")
+    with pytest.raises(Exception) as excinfo:
+        db.execute("INSERT INTO users VALUES (2, 'u2', 0)")
+    assert "PRIMARY KEY constraint failed" in str(excinfo.value)
+
+def test_single_file_table_is_imported_into_pages(tmp_path):
+    os.chdir(tmp_path)
+    db = Database()
+    db.execute("CREATE TABLE items (id INT PRIMARY KEY, created DATETIME)")
+    for i in range(1, 11):
+        db.execute(f"INSERT INTO items VALUES ({i}, '2024-01-{i:02d}T00:00:00')")
+    db = Database(buffer_pool_pages=3, page_size=4)
+    assert len(os.listdir(tmp_path / "data" / "items.pages")) == 3
+    rows = db.execute("SELECT id FROM items WHERE created = '2024-01-07T00:00:00'")
+    assert rows == [{'id': 7}]
+    assert not os.path.exists(tmp_path / "data" / "items.json")
+    assert db.catalog["items"]["storage"] == "paged"
+    with pytest.raises(Exception, match="stored in pages"):
+        Database()
+
+def test_interrupted_import_is_redone(tmp_path, monkeypatch):
+    os.chdir(tmp_path)
+    db = Database()
+    db.execute("CREATE TABLE items (id INT PRIMARY KEY, value TEXT)")
+    for i in range(1, 11):
+        db.execute(f"INSERT INTO items VALUES ({i}, 'v{i}')")
+    replace_file = storage.replace_file
+
+    def crash_before_rename(src, dst):
+        if dst.endswith(".pages"):
+            raise OSError("crashed")
+        replace_file(src, dst)
+
+    monkeypatch.setattr(storage, "replace_file", crash_before_rename)
+    with pytest.raises(OSError):
+        Database(buffer_pool_pages=2, page_size=4)
+    monkeypatch.setattr(storage, "replace_file", replace_file)
+    assert not os.path.exists(tmp_path / "data" / "items.pages")
+    # The single file is still the table: the half-built pages were never trusted.
+    db = Database()
+    db.execute("INSERT INTO items VALUES (11, 'v11')")
+    db = Database(buffer_pool_pages=2, page_size=4)
+    assert len(db.execute("SELECT * FROM items")) == 11
+    assert sorted(os.listdir(tmp_path / "data")) == ["items.pages"]
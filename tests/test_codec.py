@@ -0,0 +1,28 @@
+import pytest
+from datetime import datetime
+from mini_db.codec import RowCodec
+from mini_db.database import cast_value
+
+def test_row_codec_casts_and_round_trips():
+    codec = RowCodec(["id", "ok", "name", "created"],
+                     {"id": "INT", "ok": "BOOL", "name": "TEXT", "created": "DATETIME"})
+    row = codec.cast_row({"id": "-3", "ok": "1", "name": 5, "created": "2024-01-02T03:04:05"})
+    assert row == {"id": -3, "ok": True, "name": "5", "created": datetime(2024, 1, 2, 3, 4, 5)}
+    stored = codec.encode_row(row)
+    assert stored["created"] == "2024-01-02T03:04:05"
+    assert row["created"] == datetime(2024, 1, 2, 3, 4, 5)
+    assert codec.decode_row(dict(stored)) == row
+    with pytest.raises(ValueError) as excinfo:
+        codec.cast_row({"id": 1, "ok": True, "name": "x"})
+    assert "Missing value for column 'created'" in str(excinfo.value)
+
+def test_cast_errors_are_unchanged():
+    with pytest.raises(ValueError) as excinfo:
+        cast_value("abc", "INT")
+    assert "Invalid INT value: abc" in str(excinfo.value)
+    with pytest.raises(ValueError):
+        cast_value("maybe", "BOOL")
+    with pytest.raises(ValueError) as excinfo:
+        cast_value("x", "BLOB")
+    assert "Unknown type: BLOB" in str(excinfo.value)
+    assert cast_value(None, "INT") is None
@@ -0,0 +1,42 @@
+import os
+import time
+from mini_db.database import Database
+
+def test_memory_storage_never_touches_disk(tmp_path):
+    os.chdir(tmp_path)
+    db = Database(storage="memory")
+    db.execute("CREATE TABLE users (id INT PRIMARY KEY, name TEXT)")
+    db.execute("CREATE TABLE entries (id INT PRIMARY KEY, created DATETIME) PARTITION BY RANGE(created) INTERVAL MONTH")
+    db.execute("INSERT INTO users VALUES (1, 'Alice')")
+    db.execute("INSERT INTO entries VALUES (1, '2024-01-05T10:00:00')")
+    db.execute("UPDATE users SET name = 'Alicia' WHERE id = 1")
+    db.execute("ANALYZE")
+    assert db.execute("SELECT name FROM users WHERE id = 1") == [{'name': 'Alicia'}]
+    assert len(db.execute("SELECT * FROM entries")) == 1
+    for table in [db.tables["users"], *db.tables["entries"].partitions.values()]:
+        assert table.heap._pending == []
+    db.checkpoint()
+    db.close()
+    assert os.listdir(tmp_path) == []
+    assert Database(storage="memory").tables == {}
+
+def test_deferred_durability_writes_at_checkpoint(tmp_path):
+    os.chdir(tmp_path)
+    db = Database(durability="deferred", flush_interval=None)
+    db.execute("CREATE TABLE users (id INT PRIMARY KEY, name TEXT)")
+    db.execute("INSERT INTO users VALUES (1, 'Alice')")
+    assert Database().execute("SELECT * FROM users") == []
+    db.checkpoint()
+    assert Database().execute("SELECT name FROM users") == [{'name': 'Alice'}]
+    db.execute("INSERT INTO users VALUES (2, 'Bob')")
+    assert len(Database().execute("SELECT * FROM users")) == 1
+    db.close()
+    assert len(Database().execute("SELECT * FROM users")) == 2
+
+    db = Database(durability="deferred", flush_interval=0.05)
+    db.execute("INSERT INTO users VALUES (3, 'Carol')")
+    deadline = time.time() + 5
+    while db.tables["users"].heap.changed and time.time() < deadline:
+        time.sleep(0.05)
+    assert len(Database().execute("SELECT * FROM users")) == 3
+    db.close()
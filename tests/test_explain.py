@@ -0,0 +1,34 @@
+import os
+import pytest
+from mini_db.database import Database
+
+def test_explain_chooses_index_for_primary_key(tmp_path):
+    os.chdir(tmp_path)
+    db = Database()
+    db.execute("CREATE TABLE users (id INT PRIMARY KEY, name TEXT)")
+    db.execute("INSERT INTO users VALUES (1, 'Alice')")
+    plan = [r["plan"] for r in db.execute("EXPLAIN SELECT * FROM users WHERE id = 1")]
+    assert plan == ["Index Scan using id on users  (id = 1)"]
+    plan = [r["plan"] for r in db.execute("EXPLAIN SELECT * FROM users WHERE name = 'Alice'")]
+    assert plan == ["Seq Scan on users  (name = 'Alice')"]
+    plan = [r["plan"] for r in db.execute("EXPLAIN DELETE FROM users WHERE id = 1")]
+    assert plan[0] == "Delete on users"
+    # plain EXPLAIN must not run the statement
+    assert db.execute("SELECT * FROM users") == [{'id': 1, 'name': 'Alice'}]
+
+def test_explain_analyze_reports_rows(tmp_path):
+    os.chdir(tmp_path)
+    db = Database()
+    db.execute("CREATE TABLE users (id INT PRIMARY KEY, name TEXT)")
+    db.execute("CREATE TABLE orders (order_id INT PRIMARY KEY, user_id INT, item TEXT)")
+    db.execute("INSERT INTO users VALUES (1, 'Alice')")
+    db.execute("INSERT INTO users VALUES (2, 'Bob')")
+    db.execute("INSERT INTO orders VALUES (10, 1, 'Book')")
+    plan = [r["plan"] for r in db.execute(
+        "EXPLAIN ANALYZE SELECT users.name FROM users INNER JOIN orders ON users.id = orders.user_id")]
+    assert plan[1].startswith("Hash Join  (users.id = orders.user_id)")
+    assert "rows=1 loops=1" in plan[1]
+    assert "rows=2" in plan[2]
+    assert plan[-1].startswith("Execution time:")
+    db.execute("EXPLAIN ANALYZE UPDATE users SET name='Carol' WHERE id=2")
+    assert db.execute("SELECT name FROM users WHERE id=2") == [{'name': 'Carol'}]
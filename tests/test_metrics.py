@@ -0,0 +1,55 @@
+import os
+import pytest
+from mini_db.database import Database
+
+def test_stats_count_statements_and_scans(tmp_path):
+    os.chdir(tmp_path)
+    db = Database(metrics=True, slow_query_ms=0)
+    db.execute("CREATE TABLE users (id INT PRIMARY KEY, name TEXT)")
+    db.execute("INSERT INTO users VALUES (1, 'Alice')")
+    db.execute("INSERT INTO users VALUES (2, 'Bob')")
+    db.execute("SELECT * FROM users WHERE id = 2")
+    db.execute("SELECT * FROM users WHERE name = 'Bob'")
+    with pytest.raises(Exception):
+        db.execute("SELECT * FROM missing")
+    stats = db.stats()
+    assert stats["statements"]["INSERT"]["count"] == 2
+    assert stats["statements"]["SELECT"]["count"] == 3
+    assert stats["statements"]["SELECT"]["errors"] == 1
+    assert stats["index_probes"] == 1
+    assert stats["seq_scans"] == 1
+    assert stats["index_hit_rate"] == 0.5
+    assert stats["rows_scanned"] == 3
+    assert stats["bytes_written"] > 0
+    assert len(stats["slow_queries"]) == 6
+    db.reset_stats()
+    assert db.stats()["statements"] == {}
+
+def test_hooks_receive_events(tmp_path):
+    os.chdir(tmp_path)
+    db = Database()
+    events = []
+    db.add_hook(events.append)
+    db.execute("CREATE TABLE users (id INT PRIMARY KEY, name TEXT)")
+    db.execute("INSERT INTO users VALUES (1, 'Alice')")
+    db.execute("SELECT name FROM users")
+    assert [e["statement"] for e in events] == ["CREATE", "INSERT", "SELECT"]
+    assert events[2]["rows_returned"] == 1
+    db.remove_hook(events.append)
+    db.execute("SELECT name FROM users")
+    assert len(events) == 3
+    with pytest.raises(Exception):
+        db.stats()
+
+def test_explain_analyze_records_the_statement_work(tmp_path):
+    os.chdir(tmp_path)
+    db = Database()
+    events = []
+    db.add_hook(events.append)
+    db.execute("CREATE TABLE users (id INT PRIMARY KEY, name TEXT)")
+    db.execute("EXPLAIN ANALYZE INSERT INTO users VALUES (1, 'a')")
+    db.execute("EXPLAIN ANALYZE SELECT id FROM users WHERE name = 'a'")
+    insert, select = events[1], events[2]
+    assert insert["bytes_written"] > 0
+    assert select["seq_scans"] == 1
+    assert select["rows_scanned"] == 1
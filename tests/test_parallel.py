@@ -0,0 +1,70 @@
+import os
+import pytest
+from mini_db.database import Database
+
+@pytest.fixture
+def db(tmp_path):
+    os.chdir(tmp_path)
+    db = Database(parallel_workers=2, parallel_threshold=10)
+    db.execute("CREATE TABLE users (id INT PRIMARY KEY, name TEXT, created DATETIME)")
+    db.execute("CREATE TABLE orders (order_id INT PRIMARY KEY, user_id INT, item TEXT)")
+    db.tables["users"].insert_many(
+        {"id": i, "name": f"user{i % 5}", "created": f"2024-01-{1 + i % 28:02d}T00:00:00"} for i in range(1, 41))
+    db.tables["orders"].insert_many(
+        {"order_id": 100 + i, "user_id": i % 7, "item": f"item{i}"} for i in range(30))
+    for table in db.tables.values():
+        db.parallel.prepare(table)
+    db.parallel.wait()
+    yield db
+    db.close()
+
+def test_parallel_scan_matches_serial(db):
+    plan = [r["plan"] for r in db.execute("EXPLAIN SELECT id FROM users WHERE name = 'user3'")]
+    assert plan[0].startswith("Parallel Seq Scan on users")
+    rows = db.execute("SELECT id, created FROM users WHERE name = 'user3'")
+    assert [r["id"] for r in rows] == [3, 8, 13, 18, 23, 28, 33, 38]
+    assert rows[0]["created"].day == 4
+    db.execute("UPDATE users SET name = 'renamed' WHERE name = 'user3'")
+    assert db.execute("SELECT id FROM users WHERE name = 'user3'") == []
+    assert len(db.execute("SELECT id FROM users WHERE name = 'renamed'")) == 8
+    assert db.execute("DELETE FROM users WHERE name = 'renamed'") == 8
+
+def test_stale_export_scans_serially_until_rebuilt(db):
+    explain = "EXPLAIN SELECT id FROM users WHERE name = 'user3'"
+    db.execute("UPDATE users SET name = 'renamed' WHERE id = 3")
+    assert db.execute(explain)[0]["plan"].startswith("Seq Scan on users")
+    expected = [8, 13, 18, 23, 28, 33, 38]
+    assert [r["id"] for r in db.execute("SELECT id FROM users WHERE name = 'user3'")] == expected
+    db.parallel.wait()
+    assert db.execute(explain)[0]["plan"].startswith("Parallel Seq Scan on users")
+    assert [r["id"] for r in db.execute("SELECT id FROM users WHERE name = 'user3'")] == expected
+
+def test_parallel_hash_join_matches_serial(db):
+    sql = "SELECT users.name, orders.item FROM users INNER JOIN orders ON users.id = orders.user_id"
+    plan = [r["plan"] for r in db.execute("EXPLAIN " + sql)]
+    assert plan[0].startswith("Parallel Hash Join")
+    parallel_rows = db.execute(sql)
+    db.parallel.threshold = 10 ** 9
+    assert [r["plan"] for r in db.execute("EXPLAIN " + sql)][0].startswith("Hash Join")
+    assert parallel_rows == db.execute(sql)
+    assert len(parallel_rows) == 25
+
+def test_parallel_scan_is_counted_in_metrics(db):
+    db.enable_metrics()
+    db.execute("SELECT id FROM users WHERE name = 'user3'")
+    stats = db.stats()
+    assert stats["seq_scans"] == 1
+    assert stats["rows_scanned"] == 40
+    assert stats["index_hit_rate"] == 0
+
+def test_partitioned_outer_table_is_not_joined_in_parallel(db):
+    db.execute("CREATE TABLE members (id INT PRIMARY KEY, name TEXT) PARTITION BY HASH(name) PARTITIONS 3")
+    db.tables["members"].insert_many({"id": i, "name": f"user{i}"} for i in range(1, 41))
+    db.parallel.prepare(db.tables["members"])
+    db.parallel.wait()
+    sql = "SELECT members.id, orders.user_id FROM members INNER JOIN orders ON members.id = orders.user_id"
+    plan = [r["plan"] for r in db.execute("EXPLAIN " + sql)]
+    assert plan[0].startswith("Hash Join")
+    rows = db.execute(sql)
+    assert len(rows) == 25
+    assert all(r["members.id"] == r["orders.user_id"] for r in rows)
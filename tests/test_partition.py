@@ -0,0 +1,86 @@
+import os
+import threading
+import pytest
+from mini_db.database import Database
+
+def test_hash_partitions_prune_and_store_separately(tmp_path):
+    os.chdir(tmp_path)
+    db = Database()
+    db.execute("CREATE TABLE items (id INT PRIMARY KEY, value TEXT) PARTITION BY HASH(id) PARTITIONS 4")
+    for i in range(1, 21):
+        db.execute(f"INSERT INTO items VALUES ({i}, 'v{i}')")
+    files = sorted(f for f in os.listdir(tmp_path / "data") if f.endswith(".json"))
+    assert files == ["items__p0.json", "items__p1.json", "items__p2.json", "items__p3.json"]
+    plan = [r["plan"] for r in db.execute("EXPLAIN SELECT * FROM items WHERE id = 7")]
+    assert len(plan) == 1 and " on items__p" in plan[0]
+    plan = [r["plan"] for r in db.execute("EXPLAIN SELECT * FROM items WHERE value = 'v7'")]
+    assert plan[0] == "Append on items  (4 of 4 partitions)"
+    assert db.execute("SELECT value FROM items WHERE id = 7") == [{'value': 'v7'}]
+    assert len(db.execute("SELECT * FROM items")) == 20
+    with pytest.raises(Exception) as excinfo:
+        db.execute("INSERT INTO items VALUES (7, 'again')")
+    assert "PRIMARY KEY constraint failed" in str(excinfo.value)
+    assert db.execute("UPDATE items SET value = 'seven' WHERE id = 7") == 1
+    assert db.execute("DELETE FROM items WHERE value = 'v8'") == 1
+    db = Database()
+    assert db.execute("SELECT value FROM items WHERE id = 7") == [{'value': 'seven'}]
+    assert len(db.execute("SELECT * FROM items")) == 19
+
+def test_range_partitions_by_month(tmp_path):
+    os.chdir(tmp_path)
+    db = Database()
+    db.execute("CREATE TABLE entries (id INT PRIMARY KEY, name TEXT, created DATETIME) "
+               "PARTITION BY RANGE(created) INTERVAL MONTH")
+    db.execute("INSERT INTO entries VALUES (1, 'a', '2024-01-05T10:00:00')")
+    db.execute("INSERT INTO entries VALUES (2, 'b', '2024-02-05T10:00:00')")
+    db.execute("INSERT INTO entries VALUES (3, 'c', '2024-02-06T10:00:00')")
+    files = sorted(f for f in os.listdir(tmp_path / "data") if f.endswith(".json"))
+    assert files == ["entries__2024_01.json", "entries__2024_02.json"]
+    # the primary key is not the partition column, so it is checked across partitions
+    with pytest.raises(Exception) as excinfo:
+        db.execute("INSERT INTO entries VALUES (1, 'dup', '2024-03-01T00:00:00')")
+    assert "PRIMARY KEY constraint failed" in str(excinfo.value)
+    with pytest.raises(Exception):
+        db.execute("UPDATE entries SET created = '2024-05-01T00:00:00' WHERE id = 1")
+    db = Database()
+    assert db.catalog["entries"]["partition"]["buckets"] == ["2024_01", "2024_02"]
+    rows = db.execute("SELECT id FROM entries WHERE created = '2024-02-06T10:00:00'")
+    assert rows == [{'id': 3}]
+    assert sorted(r["id"] for r in db.execute("SELECT id FROM entries")) == [1, 2, 3]
+
+def test_writes_to_other_partitions_do_not_wait(tmp_path):
+    os.chdir(tmp_path)
+    db = Database()
+    db.execute("CREATE TABLE users (id INT PRIMARY KEY, email TEXT UNIQUE, region TEXT) "
+               "PARTITION BY HASH(region) PARTITIONS 4")
+    table = db.tables["users"]
+    north, south = table._key("north"), table._key("south")
+    assert north != south
+    slow = table.partitions[north]
+    saving, release = threading.Event(), threading.Event()
+    original_save = slow._save
+
+    def blocked_save(*args):
+        saving.set()
+        release.wait(10)
+        original_save(*args)
+
+    slow._save = blocked_save
+    writer = threading.Thread(target=db.execute, args=("INSERT INTO users VALUES (1, 'a@example.com', 'north')",))
+    writer.start()
+    try:
+        assert saving.wait(10)
+        # The north write is stuck in its save; a south write still goes through...
+        other = threading.Thread(target=db.execute, args=("INSERT INTO users VALUES (2, 'b@example.com', 'south')",))
+        other.start()
+        other.join(5)
+        assert not other.is_alive()
+        # ...and the email the north write has claimed cannot be taken meanwhile.
+        with pytest.raises(Exception, match="UNIQUE constraint failed"):
+            db.execute("INSERT INTO users VALUES (3, 'a@example.com', 'south')")
+    finally:
+        release.set()
+        writer.join(10)
+    with pytest.raises(Exception, match="UNIQUE constraint failed"):
+        db.execute("UPDATE users SET email = 'a@example.com' WHERE id = 2")
+    assert sorted(r["id"] for r in db.execute("SELECT id FROM users")) == [1, 2]
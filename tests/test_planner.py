@@ -0,0 +1,70 @@
+import os
+import pytest
+from mini_db import planner
+from mini_db.database import Database
+
+def test_analyze_collects_and_persists_statistics(tmp_path):
+    os.chdir(tmp_path)
+    db = Database()
+    db.execute("CREATE TABLE users (id INT PRIMARY KEY, name TEXT, age INT)")
+    db.tables["users"].insert_many(
+        {"id": i, "name": f"u{i}", "age": None if i % 4 == 0 else i % 3} for i in range(1, 21))
+    assert [r["plan"] for r in db.execute("EXPLAIN ANALYZE users")] == ["Analyze users"]
+    assert "users" not in db.statistics
+    assert db.execute("ANALYZE") == 1
+    stats = db.statistics["users"]
+    assert stats["rows"] == 20
+    assert stats["columns"]["id"]["distinct"] == 20
+    assert stats["columns"]["id"]["histogram"][0] == 1 and stats["columns"]["id"]["histogram"][-1] == 20
+    assert stats["columns"]["age"]["distinct"] == 3
+    assert stats["columns"]["age"]["null_frac"] == 0.25
+    assert os.path.exists(tmp_path / "catalog.stats.json")
+    assert Database().statistics == db.statistics
+    with pytest.raises(Exception):
+        db.execute("ANALYZE missing")
+    with pytest.raises(Exception, match="Cannot EXPLAIN MISSING"):
+        db.execute("EXPLAIN ANALYZE missing")
+
+def test_analyze_streams_partitions_and_samples_histograms(tmp_path, monkeypatch):
+    os.chdir(tmp_path)
+    monkeypatch.setattr(planner, "SAMPLE_ROWS", 8)
+    db = Database()
+    db.execute("CREATE TABLE items (id INT PRIMARY KEY, grp INT) PARTITION BY HASH(id) PARTITIONS 3")
+    db.tables["items"].insert_many({"id": i, "grp": None if i % 10 == 0 else i % 5} for i in range(1, 101))
+    assert db.execute("ANALYZE items") == 1
+    stats = db.statistics["items"]
+    # Counts are exact even though only 8 rows were kept for the histograms.
+    assert stats["rows"] == 100
+    assert stats["columns"]["id"]["distinct"] == 100
+    assert stats["columns"]["grp"]["distinct"] == 5
+    assert stats["columns"]["grp"]["null_frac"] == 0.1
+    histogram = stats["columns"]["id"]["histogram"]
+    assert len(histogram) == 9 and histogram == sorted(histogram)
+    assert 1 <= histogram[0] and histogram[-1] <= 100
+
+def test_cost_based_join_uses_statistics(tmp_path):
+    os.chdir(tmp_path)
+    db = Database()
+    db.execute("CREATE TABLE users (id INT PRIMARY KEY, name TEXT)")
+    db.execute("CREATE TABLE orders (order_id INT PRIMARY KEY, user_id INT, item TEXT)")
+    db.tables["users"].insert_many({"id": i, "name": f"user{i}"} for i in range(1, 51))
+    db.tables["orders"].insert_many({"order_id": i, "user_id": i * 7, "item": f"item{i}"} for i in range(1, 6))
+    sql = "SELECT users.name, orders.item FROM users INNER JOIN orders ON users.id = orders.user_id"
+    before = db.execute(sql)
+    plan = [r["plan"] for r in db.execute("EXPLAIN " + sql)]
+    assert plan[0].startswith("Hash Join") and plan[1] == "  -> Seq Scan on users"
+
+    db.execute("ANALYZE")
+    plan = [r["plan"] for r in db.execute("EXPLAIN " + sql)]
+    assert plan[0].startswith("Nested Loop Join  (users.id = orders.user_id; cost=")
+    assert plan[1:] == ["  -> Seq Scan on orders", "  -> Index Scan using id on users  (id = orders.user_id)"]
+    after = db.execute(sql)
+    assert sorted(after, key=lambda r: r["orders.item"]) == sorted(before, key=lambda r: r["orders.item"])
+    assert list(after[0]) == ["users.name", "orders.item"]
+    analyzed = [r["plan"] for r in db.execute("EXPLAIN ANALYZE " + sql)]
+    assert "rows=5 loops=5" in analyzed[3]
+
+    filtered = sql + " WHERE orders.item = 'item3'"
+    plan = [r["plan"] for r in db.execute("EXPLAIN " + filtered)]
+    assert plan[1] == "  -> Seq Scan on orders  (item = 'item3')"
+    assert db.execute(filtered) == [{'users.name': 'user21', 'orders.item': 'item3'}]
@@ -0,0 +1,133 @@
+import os
+import random
+import signal
+import subprocess
+import sys
+import pytest
+from mini_db import storage
+from mini_db.database import Database
+
+SCHEMA = "CREATE TABLE users (id INT PRIMARY KEY, name TEXT)"
+
+def statement(i):
+    if i % 10 == 9:
+        # Touches every row, so on a paged table it spans several pages.
+        return f"UPDATE users SET name = 'all{i}'"
+    if i % 5 == 4:
+        return f"DELETE FROM users WHERE id = {i - 2}"
+    if i % 3 == 2:
+        return f"UPDATE users SET name = 'renamed{i}' WHERE id = {i - 1}"
+    return f"INSERT INTO users VALUES ({i}, 'user{i}')"
+
+def contents(db):
+    return sorted((r["id"], r["name"]) for r in db.execute("SELECT * FROM users"))
+
+def model_states(count):
+    # State of the table after each prefix of the statement sequence.
+    db = Database(storage="memory")
+    db.execute(SCHEMA)
+    states = [contents(db)]
+    for i in range(count):
+        db.execute(statement(i))
+        states.append(contents(db))
+    return states
+
+class Crash(Exception):
+    pass
+
+def crash_repeatedly(tmp_path, monkeypatch, options):
+    monkeypatch.setattr(storage, "CHECKPOINT_MIN_LOG_BYTES", 300)
+    states = model_states(60)
+    real_write, real_append, real_replace = storage.write_file, storage.append_file, storage.replace_file
+    rng = random.Random(7)
+    for attempt in range(40):
+        os.chdir(tmp_path)
+        os.makedirs(f"run{attempt}")
+        os.chdir(f"run{attempt}")
+        db = Database(**options)
+        db.execute(SCHEMA)
+        writes = {"left": rng.randint(1, 80)}
+
+        def crashing(real):
+            def write(path, data):
+                writes["left"] -= 1
+                if writes["left"] == 0:
+                    # Die part way through this write, or just before this rename.
+                    if real is not real_replace:
+                        real(path, data[:rng.randint(0, len(data) - 1)])
+                    raise Crash(path)
+                real(path, data)
+            return write
+
+        monkeypatch.setattr(storage, "write_file", crashing(real_write))
+        monkeypatch.setattr(storage, "append_file", crashing(real_append))
+        monkeypatch.setattr(storage, "replace_file", crashing(real_replace))
+        done = 0
+        try:
+            for i in range(60):
+                db.execute(statement(i))
+                done += 1
+                if i % 17 == 16:
+                    db.checkpoint()
+        except Crash:
+            pass
+        monkeypatch.setattr(storage, "write_file", real_write)
+        monkeypatch.setattr(storage, "append_file", real_append)
+        monkeypatch.setattr(storage, "replace_file", real_replace)
+
+        recovered = contents(Database(**options))
+        # The interrupted statement either committed completely or not at all.
+        assert recovered in (states[done], states[min(done + 1, 60)])
+        # Writing after recovery must not trip over the dropped tail of the log.
+        db = Database(**options)
+        db.execute("INSERT INTO users VALUES (1000, 'after')")
+        assert contents(Database(**options)) == sorted(recovered + [(1000, 'after')])
+
+def test_torn_writes_recover_to_a_statement_boundary(tmp_path, monkeypatch):
+    crash_repeatedly(tmp_path, monkeypatch, {})
+    with open("data/users.json", "r+b") as f:
+        f.truncate(10)
+    with pytest.raises(Exception) as excinfo:
+        Database()
+    assert "checksum" in str(excinfo.value)
+
+def test_paged_tables_recover_to_a_statement_boundary(tmp_path, monkeypatch):
+    # Two pages for the whole database: statements are evicted part way through.
+    crash_repeatedly(tmp_path, monkeypatch, {"buffer_pool_pages": 2, "page_size": 4})
+
+CHILD = """
+import sys
+from mini_db import storage
+from mini_db.database import Database
+from test_recovery import SCHEMA, statement
+storage.CHECKPOINT_MIN_LOG_BYTES = 500
+db = Database()
+db.execute(SCHEMA)
+for i in range(int(sys.argv[1])):
+    db.execute(statement(i))
+    print(i + 1, flush=True)
+"""
+
+def test_killed_process_recovers_every_acknowledged_statement(tmp_path):
+    total = 400
+    states = model_states(total)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, os.path.join(root, "tests")]))
+    rng = random.Random(11)
+    for attempt in range(3):
+        workdir = tmp_path / f"run{attempt}"
+        workdir.mkdir()
+        child = subprocess.Popen([sys.executable, "-c", CHILD, str(total)], cwd=workdir, env=env,
+                                 stdout=subprocess.PIPE, text=True)
+        acked = 0
+        stop_after = rng.randint(20, total - 50)
+        for line in child.stdout:
+            acked = int(line)
+            if acked >= stop_after:
+                break
+        child.send_signal(signal.SIGKILL)
+        child.wait()
+        child.stdout.close()
+        os.chdir(workdir)
+        recovered = contents(Database())
+        assert recovered in states[acked:]
@@ -0,0 +1,55 @@
+import io
+import json
+import os
+import pytest
+
+django = pytest.importorskip("django")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "guestbook_site.settings")
+django.setup()
+
+from django.core.management import call_command
+from django.test import Client, override_settings
+from mini_db.database import Database
+
+@pytest.fixture
+def guestbook(tmp_path, monkeypatch):
+    # The views open a database in the working directory on import; give each test a fresh one.
+    os.chdir(tmp_path)
+    from guestbook_app import views
+    db = Database(catalog_file="guestbook.json", data_dir="guestbook_data")
+    db.execute("CREATE TABLE entries (id INT PRIMARY KEY, name TEXT, message TEXT, created DATETIME)")
+    monkeypatch.setattr(views, "db", db)
+    return db
+
+def test_replay_reports_per_view_latency(tmp_path, guestbook):
+    path = tmp_path / "requests.jsonl"
+    lines = [
+        {"method": "GET", "path": "/"},
+        {"method": "POST", "path": "/add/", "data": {"name": "Ann", "message": "hello"}},
+        {"event": "server_started"},
+        {"method": "GET", "path": "/"},
+    ]
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines))
+    out = io.StringIO()
+    call_command("replay", str(path), "--json", stdout=out)
+    report = json.loads(out.getvalue())
+    assert report["requests"] == 3
+    assert report["skipped_lines"] == 1
+    assert {name: stats["count"] for name, stats in report["views"].items()} == {"list": 2, "add": 1}
+    assert all(stats["errors"] == 0 for stats in report["views"].values())
+    assert report["data_growth_bytes"] is not None
+    assert guestbook.execute("SELECT name FROM entries") == [{'name': 'Ann'}]
+
+def test_middleware_records_one_line_per_request(tmp_path, guestbook):
+    record_file = tmp_path / "recorded.jsonl"
+    with override_settings(GUESTBOOK_RECORD_FILE=str(record_file)):
+        client = Client(HTTP_HOST="localhost")
+        client.get("/")
+        client.post("/add/", {"name": "Bob", "message": "hi"})
+        client.get("/?page=2")
+    records = [json.loads(line) for line in record_file.read_text().splitlines()]
+    assert records == [
+        {"method": "GET", "path": "/"},
+        {"method": "POST", "path": "/add/", "data": {"name": "Bob", "message": "hi"}},
+        {"method": "GET", "path": "/?page=2"},
+    ]
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import socket
+import threading
+import pytest
+from datetime import datetime
+from mini_db.database import Database
+from mini_db.server import start_server
+from mini_db import protocol
+from mini_db.client import Connection, ConnectionPool, RemoteError
+
+@pytest.fixture
+def address(tmp_path):
+    os.chdir(tmp_path)
+    db = Database()
+    address = f"unix:{tmp_path / 'mini_db.sock'}"
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(start_server(db, address))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield address
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    server.close()
+    loop.run_until_complete(server.wait_closed())
+    loop.close()
+
+def test_pool_executes_statements(address):
+    pool = ConnectionPool(address, size=2)
+    pool.execute("CREATE TABLE entries (id INT PRIMARY KEY, name TEXT, created DATETIME)")
+    pool.execute("INSERT INTO entries VALUES (1, 'Alice', '2024-01-02T03:04:05')")
+    rows = pool.execute("SELECT * FROM entries WHERE id = 1")
+    assert rows == [{'id': 1, 'name': 'Alice', 'created': datetime(2024, 1, 2, 3, 4, 5)}]
+    with pytest.raises(RemoteError) as excinfo:
+        pool.execute("INSERT INTO entries VALUES (1, 'Bob', '2024-01-02T03:04:05')")
+    assert "PRIMARY KEY constraint failed" in str(excinfo.value)
+    # the connection is still usable after a statement error
+    assert pool.execute("SELECT name FROM entries") == [{'name': 'Alice'}]
+    pool.close()
+
+def test_pipeline_returns_results_in_order(address):
+    pool = ConnectionPool(address, size=1)
+    pool.execute("CREATE TABLE items (id INT PRIMARY KEY, value TEXT)")
+    statements = [f"INSERT INTO items VALUES ({i}, 'v{i}')" for i in range(20)]
+    statements.append("SELECT id FROM items WHERE id = 7")
+    results = pool.pipeline(statements)
+    assert len(results) == 21
+    assert results[3] == {'id': 3, 'value': 'v3'}
+    assert results[-1] == [{'id': 7}]
+    pool.close()
+
+def test_large_pipeline_does_not_deadlock(address):
+    conn = Connection(address, timeout=30)
+    conn.execute("CREATE TABLE items (id INT PRIMARY KEY, value TEXT)")
+    conn.execute("INSERT INTO items VALUES (1, 'one')")
+    results = conn.pipeline(["SELECT * FROM items"] * 20000)
+    assert len(results) == 20000 and results[-1] == [{'id': 1, 'value': 'one'}]
+    conn.close()
+
+def test_malformed_request_gets_an_error_reply(address):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(10)
+    sock.connect(address[len("unix:"):])
+    reader = sock.makefile("rb")
+    for message in ([], {"id": 5}, {"id": 6, "sql": 42}):
+        sock.sendall(protocol.encode(message))
+        header = reader.read(protocol.HEADER.size)
+        response = protocol.decode(reader.read(protocol.frame_length(header)))
+        assert response["ok"] is False
+    assert response["id"] == 6
+    reader.close()
+    sock.close()